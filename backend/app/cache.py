@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+from app.config import settings
+
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: Optional[str] = None, where: Optional[Callable] = None,
+                   where_value: Optional[Callable] = None) -> None:
+        """Drop every entry, only those whose key starts with `namespace`,
+        or those whose key satisfies `where` (value: `where_value`)"""
+        with self._lock:
+            if namespace is None and where is None and where_value is None:
+                self.invalidations += len(self._data)
+                self._data.clear()
+                return
+            stale = [
+                k for k, (value, _) in self._data.items()
+                if (namespace is None or (isinstance(k, tuple) and k and k[0] == namespace))
+                and (where is None or where(k))
+                and (where_value is None or where_value(value))
+            ]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+
+class CachedResult(NamedTuple):
+    value: Any
+    age: float  # seconds since the value was computed
+    state: str  # "hit", "stale" or "miss"
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.computed_at = 0.0
+
+
+class ResultCache:
+    """TTL cache for expensive computed results.
+
+    Concurrent misses for the same key are coalesced into one computation
+    (single-flight). For `stale_ttl` seconds after expiry the old value is
+    still served while one background thread recomputes it.
+    """
+
+    def __init__(self, ttl: float = 30.0, stale_ttl: float = 300.0, maxsize: int = 128):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> CachedResult:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, computed_at = entry
+                age = now - computed_at
+                if age < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return CachedResult(value, age, "hit")
+                if age < self.ttl + self.stale_ttl:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._flights:
+                        self.refreshes += 1
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._run, args=(key, compute, flight), daemon=True
+                        ).start()
+                    return CachedResult(value, age, "stale")
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._run(key, compute, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return CachedResult(flight.value, time.monotonic() - flight.computed_at, "miss")
+
+    def _run(self, key: Hashable, compute: Callable[[], Any], flight: _Flight) -> None:
+        try:
+            flight.value = compute()
+            flight.computed_at = time.monotonic()
+        except Exception as exc:
+            flight.error = exc
+            logger.exception("Computing cached result %r failed", key)
+        with self._lock:
+            if flight.error is None:
+                self._data[key] = (flight.value, flight.computed_at)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            else:
+                self.errors += 1
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "in_flight": len(self._flights)
+            }
+
+
+def set_cache_headers(response, result: CachedResult) -> None:
+    """Expose how old a cached result is"""
+    response.headers["X-Cache"] = result.state.upper()
+    response.headers["X-Cache-Age"] = str(int(result.age))
+
+
+# User-independent parts of event listings and search results. Keys are
+# (namespace, events revision, ...) from EventService.list_version(), so
+# entries are never served across a write even from another worker.
+# Writes in this process drop the entries their revision made unreachable.
+listing_cache = LRUCache(
+    maxsize=settings.LISTING_CACHE_SIZE,
+    ttl=settings.LISTING_CACHE_TTL
+)
+
+
+def invalidate_listings(revision: int) -> None:
+    """Drop listing entries cached for an events revision older than `revision`"""
+    listing_cache.invalidate(where=lambda key: key[1] < revision)
+
+# Counts of closed time-series buckets. Only cancellations and deletions
+# can change the past, and they invalidate the affected ranges; the TTL
+# bounds staleness from writes made by other workers.
+timeseries_cache = LRUCache(
+    maxsize=settings.TIMESERIES_CACHE_SIZE,
+    ttl=settings.TIMESERIES_CACHE_TTL
+)
+
+# Admin statistics (dashboard, report, event stats). Served up to
+# STATS_CACHE_TTL old, then stale for STATS_CACHE_STALE_TTL more while
+# refreshed in the background.
+stats_cache = ResultCache(
+    ttl=settings.STATS_CACHE_TTL,
+    stale_ttl=settings.STATS_CACHE_STALE_TTL
+)
+
+# Verified bearer token -> (Principal, token expiry). Writes to a user in
+# this process drop their entries; the TTL bounds how long another
+# worker's change (e.g. a new role) can go unnoticed.
+principal_cache = LRUCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
@@ -0,0 +1,122 @@
+"""Maintenance commands.
+
+Usage:
+    python -m app.cli reconcile-counters [--fix]
+    python -m app.cli rebuild-search-index
+    python -m app.cli rebuild-rollups [--check]
+    python -m app.cli prune-tombstones [--days N]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal, Base, engine, upgrade_schema
+from app.models import User, Event, Registration
+from app.services.change_service import ChangeService
+from app.services.event_service import EventService
+from app.services.rollup_service import RollupService
+from app.services.search_service import SearchService
+
+
+def reconcile_counters(args) -> int:
+    db = SessionLocal()
+    try:
+        mismatches = EventService(db).reconcile_registration_counts(fix=args.fix)
+    finally:
+        db.close()
+
+    for m in mismatches:
+        print(f"event {m['event_id']}: stored={m['stored']} actual={m['actual']}")
+    if not mismatches:
+        print("All registration counters are consistent")
+        return 0
+    if args.fix:
+        print(f"Fixed {len(mismatches)} event(s)")
+        return 0
+    return 1
+
+
+def rebuild_search_index(args) -> int:
+    db = SessionLocal()
+    try:
+        search = SearchService(db)
+        count = search.rebuild_trigrams()
+        print(f"Rebuilt fuzzy search trigrams for {count} event(s)")
+        search.ensure_index()
+        if not search.fts_enabled:
+            print("Full-text search is not available for this database")
+            return 1
+        count = search.rebuild_index()
+    finally:
+        db.close()
+    print(f"Rebuilt full-text index for {count} event(s)")
+    return 0
+
+
+def rebuild_rollups(args) -> int:
+    db = SessionLocal()
+    try:
+        mismatches = RollupService(db).rebuild(fix=not args.check)
+    finally:
+        db.close()
+
+    for m in mismatches:
+        print(f"{m['scope']} {m['key']!r}: stored={m['stored']} actual={m['actual']}")
+    if args.check:
+        if mismatches:
+            return 1
+        print("All statistics rollups are consistent")
+        return 0
+    print(f"Rebuilt statistics rollups ({len(mismatches)} value(s) were out of date)")
+    return 0
+
+
+def prune_tombstones(args) -> int:
+    db = SessionLocal()
+    try:
+        count = ChangeService(db).prune(datetime.utcnow() - timedelta(days=args.days))
+    finally:
+        db.close()
+    print(f"Removed {count} tombstone(s) older than {args.days} day(s)")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser(
+        "reconcile-counters",
+        help="Check Event.registration_count against the registrations table"
+    )
+    reconcile.add_argument("--fix", action="store_true", help="Overwrite wrong counters")
+    reconcile.set_defaults(func=reconcile_counters)
+
+    rebuild = commands.add_parser(
+        "rebuild-search-index",
+        help="Recreate the full-text and fuzzy search indexes from the events table"
+    )
+    rebuild.set_defaults(func=rebuild_search_index)
+
+    rollups = commands.add_parser(
+        "rebuild-rollups",
+        help="Recompute the statistics rollups from the live tables"
+    )
+    rollups.add_argument("--check", action="store_true", help="Only report differences, do not write")
+    rollups.set_defaults(func=rebuild_rollups)
+
+    prune = commands.add_parser(
+        "prune-tombstones",
+        help="Forget deletions older than the delta export consumers can still ask for"
+    )
+    prune.add_argument("--days", type=int, default=90, help="Keep this many days (default: 90)")
+    prune.set_defaults(func=prune_tombstones)
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
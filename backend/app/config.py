@@ -7,6 +7,26 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    LISTING_CACHE_SIZE: int = 512  # entries
+    LISTING_CACHE_TTL: float = 60.0  # seconds
+    AUTOCOMPLETE_SYNC_SECONDS: float = 5.0  # how often to check for writes from other workers
+    RECOMMENDATION_REFRESH_SECONDS: float = 300.0  # minimum age before a background rebuild
+    RECOMMENDATION_RETRY_SECONDS: float = 60.0  # wait after a failed rebuild before trying again
+    TIMESERIES_CACHE_SIZE: int = 256  # entries
+    TIMESERIES_CACHE_TTL: float = 3600.0  # seconds
+    STATS_CACHE_TTL: float = 30.0  # seconds a stats result is served as fresh
+    STATS_CACHE_STALE_TTL: float = 300.0  # further seconds it is served while refreshing
+    EXPORT_DIR: str = "exports"  # where background export files are written
+    EXPORT_WORKERS: int = 2
+    EXPORT_JOB_TTL: float = 86400.0  # seconds a finished export can be downloaded
+    EXPORT_JOB_HEARTBEAT_TIMEOUT: float = 300.0  # seconds without a heartbeat before an active job is failed
+    EXPORT_JOB_THRESHOLD_ROWS: int = 50000  # larger CSV exports become jobs; 0 disables
+    EXPORT_WATERMARK_LAG_SECONDS: float = 5.0  # longest commit delay a delta export tolerates
+    BCRYPT_ROUNDS: int = 12  # cost of new password hashes; others are rehashed at login
+    PASSWORD_HASH_WORKERS: int = 2  # processes dedicated to bcrypt
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # pending hashes before sign-ins get 503
+    PRINCIPAL_CACHE_SIZE: int = 4096  # authenticated tokens
+    PRINCIPAL_CACHE_TTL: float = 60.0  # seconds a user's id/role/group are trusted without a lookup
 
     class Config:
         env_file = ".env"
@@ -2,18 +2,54 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal, upgrade_schema
 from app.middleware import LoggingMiddleware
 from app.routers import auth, users, events, registrations
 from app.routers import stats, search, export
 from app.models import User, Event, Registration
+from app.services.event_service import EventService
+from app.services.revision_service import RevisionService, EVENTS_REVISION
+from app.services.rollup_service import RollupService
+from app.services.change_service import ChangeService
+from app.services.search_service import SearchService
+from app.services.autocomplete import autocomplete_index
+from app.services.recommendations import recommendation_engine
+from app.services.export_jobs import ExportJobService, export_worker
+from app.services.passwords import password_hasher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Create tables
     Base.metadata.create_all(bind=engine)
+    added = upgrade_schema()
+    db = SessionLocal()
+    try:
+        if ("events", "registration_count") in added:
+            # Backfill the counter for databases created before it existed
+            EventService(db).reconcile_registration_counts(fix=True)
+        RevisionService(db).ensure(EVENTS_REVISION)
+        ChangeService(db).backfill_updated_at()
+        rollups = RollupService(db)
+        if ("users", "registration_count") in added:
+            rollups.rebuild(fix=True)
+        else:
+            rollups.ensure()
+        search = SearchService(db)
+        if search.ensure_index():
+            search.rebuild_index()
+        search.ensure_trigrams()
+        autocomplete_index.build(db)
+        recommendation_engine.rebuild(db)
+        export_jobs = ExportJobService(db)
+        export_jobs.fail_interrupted()
+        export_jobs.cleanup_expired()
+    finally:
+        db.close()
+    password_hasher.start()
     yield
+    export_worker.shutdown()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
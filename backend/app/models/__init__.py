@@ -1,4 +1,8 @@
 from app.models.user import User
 from app.models.event import Event
 from app.models.registration import Registration
-
+from app.models.revision import Revision
+from app.models.event_trigram import EventTrigram
+from app.models.stat_counter import StatCounter
+from app.models.export_job import ExportJob
+from app.models.tombstone import Tombstone
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index, and_, case
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -22,14 +23,24 @@ class Event(Base):
     max_participants = Column(Integer, nullable=False, default=20)
     created_by = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Denormalized count of rows in `registrations` for this event, kept in
+    # step by RegistrationService so listings never load the collection.
+    registration_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped whenever the event or its registrations change; used for ETags
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
 
     registrations = relationship("Registration", back_populates="event", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_events_date_id", "date", "id"),
+    )
+
     @property
     def current_participants(self):
-        return len(self.registrations) if self.registrations else 0
+        return self.registration_count or 0
 
-    @property
+    @hybrid_property
     def status(self):
         if self.date < datetime.utcnow():
             return EventStatus.FINISHED
@@ -37,7 +48,45 @@ class Event(Base):
             return EventStatus.FULL
         return EventStatus.UPCOMING
 
-    @property
+    @status.expression
+    def status(cls):
+        return case(
+            (cls.date < datetime.utcnow(), EventStatus.FINISHED.value),
+            (cls.registration_count >= cls.max_participants, EventStatus.FULL.value),
+            else_=EventStatus.UPCOMING.value
+        )
+
+    @hybrid_property
     def available_spots(self):
         return max(0, self.max_participants - self.current_participants)
 
+    @available_spots.expression
+    def available_spots(cls):
+        return case(
+            (cls.registration_count < cls.max_participants,
+             cls.max_participants - cls.registration_count),
+            else_=0
+        )
+
+    @hybrid_property
+    def has_spots(self):
+        return self.current_participants < self.max_participants
+
+    @has_spots.expression
+    def has_spots(cls):
+        return cls.registration_count < cls.max_participants
+
+    @classmethod
+    def status_filter(cls, status):
+        """Index-friendly WHERE clause equivalent to `Event.status == status`.
+
+        The CASE expression behind `status` cannot use an index, so the
+        status is expanded into a range condition on `date`.
+        """
+        status = EventStatus(status)
+        now = datetime.utcnow()
+        if status == EventStatus.FINISHED:
+            return cls.date < now
+        if status == EventStatus.FULL:
+            return and_(cls.date >= now, cls.registration_count >= cls.max_participants)
+        return and_(cls.date >= now, cls.registration_count < cls.max_participants)
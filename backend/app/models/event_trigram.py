@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+
+class EventTrigram(Base):
+    """Trigram of a normalized event title or location, for fuzzy search"""
+    __tablename__ = "event_trigrams"
+
+    trigram = Column(String(3), primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True, index=True)
+    field = Column(String(20), primary_key=True)  # "title" or "location"
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum
+from datetime import datetime
+import enum
+from app.database import Base
+
+
+class ExportKind(str, enum.Enum):
+    EVENTS = "events"
+    USERS = "users"
+    PARTICIPANTS = "participants"
+    REPORT = "report"
+
+
+class ExportJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+
+class ExportJob(Base):
+    """An export produced in the background and kept as a file until it expires"""
+    __tablename__ = "export_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(Enum(ExportKind), nullable=False)
+    event_id = Column(Integer, nullable=True)  # participants exports only
+    gzip = Column(Boolean, nullable=False, default=False)
+    status = Column(Enum(ExportJobStatus), nullable=False, default=ExportJobStatus.QUEUED, index=True)
+    progress = Column(Integer, nullable=False, default=0)  # rows written
+    total = Column(Integer, nullable=True)  # rows expected
+    filename = Column(String(255), nullable=False)
+    path = Column(String(500), nullable=True)
+    size = Column(Integer, nullable=True)  # bytes
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, nullable=False)
+    worker = Column(String(100), nullable=True)  # process the job was submitted to
+    heartbeat_at = Column(DateTime, nullable=True)  # last sign of life from that process
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
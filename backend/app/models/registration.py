@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -11,11 +11,16 @@ class Registration(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
     registered_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="registrations")
     event = relationship("Event", back_populates="registrations")
 
     __table_args__ = (
         UniqueConstraint('user_id', 'event_id', name='unique_user_event'),
+        # Per-event lookups and timelines (the unique constraint leads with user_id)
+        Index("ix_registrations_event_registered", "event_id", "registered_at"),
+        # Rolling-window counts over recent registrations
+        Index("ix_registrations_registered_at", "registered_at"),
     )
 
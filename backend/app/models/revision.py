@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class Revision(Base):
+    """Monotonic version counter for a set of rows, bumped on every write"""
+    __tablename__ = "revisions"
+
+    name = Column(String(100), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
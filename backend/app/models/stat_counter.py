@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class StatCounter(Base):
+    """Rollup counter, updated in the same transaction as the rows it counts"""
+    __tablename__ = "stat_counters"
+
+    scope = Column(String(50), primary_key=True)  # e.g. "totals", "daily_registrations"
+    key = Column(String(100), primary_key=True)  # e.g. "users", "2024-01-31", a group name
+    value = Column(Integer, nullable=False, default=0, server_default="0")
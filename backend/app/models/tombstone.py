@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class Tombstone(Base):
+    """Record of a deleted row, so delta exports can report deletions"""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(50), nullable=False)  # "event", "user" or "registration"
+    entity_id = Column(Integer, nullable=False)
+    event_id = Column(Integer, nullable=True)  # registrations only
+    user_id = Column(Integer, nullable=True)  # registrations only
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_entity_deleted_at", "entity", "deleted_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -20,6 +20,16 @@ class User(Base):
     group = Column(String(50), nullable=True)  # e.g., "1F1"
     role = Column(Enum(UserRole), default=UserRole.STUDENT)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Denormalized count of the user's registrations, kept in step by
+    # RollupService alongside the other statistics rollups.
+    registration_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     registrations = relationship("Registration", back_populates="user", cascade="all, delete-orphan")
 
+
+# Leaderboard order (most registrations first, then oldest account), so a
+# page or a rank is an index range scan rather than a sort
+Index("ix_users_leaderboard", User.role, User.registration_count.desc(), User.id)
+Index("ix_users_group_leaderboard", User.group, User.role, User.registration_count.desc(), User.id)
+
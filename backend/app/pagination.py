@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort-key values of the last row into an opaque cursor"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: list) -> list:
+    """Decode a cursor made by encode_cursor, converting each value to `types`"""
+    invalid = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise invalid
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise invalid
+
+    values = []
+    for python_type, value in zip(types, payload):
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            else:
+                value = python_type(value)
+        except (ValueError, TypeError):
+            raise invalid
+        values.append(value)
+    return values
+
+
+def keyset_paginate(
+    query,
+    columns: list,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    descending: bool = False,
+    key: Optional[Callable] = None
+) -> Tuple[List, Optional[str]]:
+    """Fetch one page of `query` ordered by `columns`.
+
+    With a cursor the page starts right after the row it encodes, so the
+    cost does not grow with the page number; `offset` is kept for the
+    page/per_page style. `key` extracts the sort values from a result row
+    when they are not plain attributes named like the columns. Returns
+    the rows and the cursor of the next page (None on the last page).
+    """
+    if cursor:
+        values = decode_cursor(cursor, [c.type.python_type for c in columns])
+        if len(columns) == 1:
+            sort_key, values = columns[0], values[0]
+        else:
+            sort_key, values = tuple_(*columns), tuple_(*values)
+        query = query.filter(sort_key < values if descending else sort_key > values)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).offset(offset).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [getattr(last, c.key) for c in columns]
+        next_cursor = encode_cursor(values)
+    return rows, next_cursor
@@ -1,20 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, AdminCreate
 from app.services.user_service import UserService
 from app.services.auth import create_access_token, ADMIN_SECRET_KEY
+from app.services.passwords import password_hasher
 from app.models.user import UserRole
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 
+# The handlers are async: bcrypt runs on the password hasher's process pool
+# and the database work in the threadpool, so neither holds a thread while
+# a password is hashed.
+
+
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new student user"""
     service = UserService(db)
-    user = service.create_user(user_data, role=UserRole.STUDENT)
+    hashed_password = await password_hasher.hash(user_data.password)
+    user = await run_in_threadpool(service.create_user, user_data, UserRole.STUDENT, hashed_password)
     access_token = create_access_token(data={"sub": user.id})
     return Token(
         access_token=access_token,
@@ -24,7 +32,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/admin/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
+async def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
     """Register a new admin user (requires secret key)"""
     if admin_data.secret_key != ADMIN_SECRET_KEY:
         raise HTTPException(
@@ -39,7 +47,8 @@ def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
         full_name=admin_data.full_name,
         group=None
     )
-    user = service.create_user(user_data, role=UserRole.ADMIN)
+    hashed_password = await password_hasher.hash(user_data.password)
+    user = await run_in_threadpool(service.create_user, user_data, UserRole.ADMIN, hashed_password)
     access_token = create_access_token(data={"sub": user.id})
     return Token(
         access_token=access_token,
@@ -49,15 +58,22 @@ def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
-    """Login with email and password"""
+async def login(login_data: UserLogin, db: Session = Depends(get_db)):
+    """Login with email and password.
+
+    Passwords hashed with another cost than BCRYPT_ROUNDS are rehashed.
+    """
     service = UserService(db)
-    user = service.authenticate(login_data.email, login_data.password)
-    if not user:
+    user = await run_in_threadpool(service.get_by_email, login_data.email)
+    if not user or not await password_hasher.verify(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    if password_hasher.needs_rehash(user.hashed_password):
+        hashed_password = await password_hasher.hash(login_data.password)
+        await run_in_threadpool(service.set_password_hash, user, hashed_password)
+        password_hasher.record_rehash()
     access_token = create_access_token(data={"sub": user.id})
     return Token(
         access_token=access_token,
@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from app.database import get_db
-from app.models.user import User
+from app.models.event import EventStatus
 from app.schemas.event import EventCreate, EventUpdate, EventResponse, EventListResponse
-from app.services.auth import get_current_user, get_current_admin
+from app.services.auth import Principal, get_current_principal, get_current_admin
 from app.services.event_service import EventService
+from app.services.revision_service import make_etag, etag_matches
+from app.cache import listing_cache
 
 router = APIRouter(prefix="/api/events", tags=["Events"])
 
 
-def event_to_response(event, user_id: int = None, include_participants: bool = False, service: EventService = None):
+def event_to_response(
+    event,
+    user_id: int = None,
+    include_participants: bool = False,
+    service: EventService = None,
+    registered_ids: Optional[Set[int]] = None
+):
+    if registered_ids is not None:
+        is_registered = event.id in registered_ids
+    else:
+        is_registered = service.is_user_registered(event.id, user_id) if user_id and service else False
     response = {
         "id": event.id,
         "title": event.title,
@@ -24,7 +36,7 @@ def event_to_response(event, user_id: int = None, include_participants: bool = F
         "status": event.status,
         "created_by": event.created_by,
         "created_at": event.created_at,
-        "is_registered": service.is_user_registered(event.id, user_id) if user_id and service else False,
+        "is_registered": is_registered,
         "participants": service.get_event_participants(event.id) if include_participants and service else None
     }
     return EventResponse(**response)
@@ -32,34 +44,80 @@ def event_to_response(event, user_id: int = None, include_participants: bool = F
 
 @router.get("/", response_model=EventListResponse)
 def get_events(
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    status: Optional[str] = None,
+    status: Optional[EventStatus] = None,
     search: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(True, description="Set to false to skip counting all matches"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get all events with pagination and filtering"""
+    """Get all events with pagination and filtering.
+
+    Pass `next_cursor` back as `cursor` for keyset pagination; `page` is
+    ignored when a cursor is given. Responses carry an ETag, and a
+    matching If-None-Match gets 304 Not Modified.
+    """
     service = EventService(db)
-    skip = (page - 1) * per_page
-    events, total = service.get_events(skip, per_page, status, search)
+    version = service.list_version()
+    etag = make_etag(
+        "events", *version, current_user.id,
+        page, per_page, status and status.value, search, cursor, with_total
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # The page itself does not depend on the user; only is_registered does
+    cache_key = ("events", *version, page, per_page, status, search, cursor, with_total)
+    cached = listing_cache.get(cache_key)
+    if cached is None:
+        skip = (page - 1) * per_page
+        events, total, next_cursor = service.get_events(
+            skip, per_page, status, search, cursor=cursor, with_total=with_total
+        )
+        cached = {
+            "events": [event_to_response(e) for e in events],
+            "total": total,
+            "next_cursor": next_cursor
+        }
+        listing_cache.set(cache_key, cached)
+    
+    registered_ids = service.get_registered_event_ids(
+        current_user.id, [e.id for e in cached["events"]]
+    )
     
+    response.headers["ETag"] = etag
     return EventListResponse(
-        events=[event_to_response(e, current_user.id, False, service) for e in events],
-        total=total,
+        events=[
+            e.model_copy(update={"is_registered": e.id in registered_ids})
+            for e in cached["events"]
+        ],
+        total=cached["total"],
         page=page,
-        per_page=per_page
+        per_page=per_page,
+        next_cursor=cached["next_cursor"]
     )
 
 
 @router.get("/{event_id}", response_model=EventResponse)
 def get_event(
     event_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get event details"""
     service = EventService(db)
+    version = service.event_version(event_id)
+    if version is not None:
+        etag = make_etag("event", event_id, *version, current_user.id)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
     event = service.get_event(event_id)
     return event_to_response(event, current_user.id, False, service)
 
@@ -67,7 +125,7 @@ def get_event(
 @router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
 def create_event(
     event_data: EventCreate,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Create a new event (Admin only)"""
@@ -80,7 +138,7 @@ def create_event(
 def update_event(
     event_id: int,
     event_data: EventUpdate,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Update an event (Admin only)"""
@@ -92,7 +150,7 @@ def update_event(
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_event(
     event_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete an event (Admin only)"""
@@ -103,7 +161,7 @@ def delete_event(
 @router.get("/{event_id}/participants")
 def get_event_participants(
     event_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get list of participants for an event (Admin only)"""
@@ -1,160 +1,313 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import PlainTextResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from sqlalchemy import func
-from datetime import datetime, timedelta
-import csv
-import io
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+import os
 
+from app.config import settings
 from app.database import get_db
-from app.models.user import User, UserRole
+from app.models.user import User
 from app.models.event import Event
-from app.models.registration import Registration
-from app.services.auth import get_current_admin
+from app.models.export_job import ExportJob, ExportJobStatus, ExportKind
+from app.services.auth import Principal, get_current_admin
+from app.schemas.export import ExportJobCreate, ExportJobResponse
+from app.services.export_jobs import ExportJobService
+from app.services.change_service import next_watermark
+from app.services.export_service import ExportService, stream_csv, stream_participants_archive
+from app.services.stats_service import StatsService, cached_stats
+from app.cache import set_cache_headers
 
 router = APIRouter(prefix="/api/export", tags=["Export"])
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _job_response(job: ExportJob) -> ExportJobResponse:
+    response = ExportJobResponse.model_validate(job)
+    if job.status == ExportJobStatus.DONE:
+        response.download_url = f"/api/export/jobs/{job.id}/download"
+    return response
+
+
+def _redirect_to_job(db: Session, rows: int, kind: ExportKind, user_id: int,
+                     event_id: Optional[int] = None, gzip: bool = False):
+    """Turn an export that is too big to stream inline into a background job"""
+    threshold = settings.EXPORT_JOB_THRESHOLD_ROWS
+    if not threshold or rows <= threshold:
+        return None
+    job = ExportJobService(db).create(kind, user_id, event_id=event_id, gzip=gzip)
+    return RedirectResponse(f"/api/export/jobs/{job.id}", status_code=status.HTTP_303_SEE_OTHER)
+
+
+def _csv_response(export, filename: str, *args, gzip: bool = False,
+                  headers: Optional[dict] = None) -> StreamingResponse:
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        stream_csv(export, *args, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}", **(headers or {})}
+    )
 
-@router.get("/events/csv", response_class=PlainTextResponse)
+
+def _delta_headers(since: Optional[datetime]) -> dict:
+    """Watermark to pass as `since` on the next delta export"""
+    if since is None:
+        return {}
+    return {"X-Export-Watermark": next_watermark().isoformat()}
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+SINCE_DESCRIPTION = "Only rows changed (or deleted) at or after this watermark"
+
+
+@router.get("/events/csv", response_class=StreamingResponse)
 def export_events_csv(
-    current_user: User = Depends(get_current_admin),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Export all events to CSV (Admin only)"""
-    events = db.query(Event).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow([
-        "ID", "Title", "Description", "Date", "Location",
-        "Max Participants", "Current Participants", "Status", "Created At"
-    ])
-    
-    for e in events:
-        writer.writerow([
-            e.id, e.title, e.description or "", e.date.isoformat(),
-            e.location, e.max_participants, e.current_participants,
-            e.status.value, e.created_at.isoformat()
-        ])
-    
-    return PlainTextResponse(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=events.csv"}
+    """Export all events to CSV (Admin only).
+
+    Above EXPORT_JOB_THRESHOLD_ROWS rows a full export redirects to a
+    background job. With `since` only changes are exported and the
+    X-Export-Watermark header holds the value for the next call.
+
+    Status is derived from the date and the participant count, so an
+    event that becomes "finished" just by time passing is not in a delta
+    export; recompute statuses from the Date column if that matters.
+    """
+    since = _utc(since)
+    if since is None:
+        rows = db.query(func.count(Event.id)).scalar()
+        redirect = _redirect_to_job(db, rows, ExportKind.EVENTS, current_user.id, gzip=gzip)
+        if redirect:
+            return redirect
+    return _csv_response(
+        ExportService.events, "events.csv", since, gzip=gzip, headers=_delta_headers(since)
     )
 
 
-@router.get("/events/{event_id}/participants/csv", response_class=PlainTextResponse)
+@router.get("/events/{event_id}/participants/csv", response_class=StreamingResponse)
 def export_participants_csv(
     event_id: int,
-    current_user: User = Depends(get_current_admin),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Export event participants to CSV (Admin only)"""
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    since = _utc(since)
+    rows = db.query(Event.registration_count).filter(Event.id == event_id).scalar()
+    if rows is None:
         return PlainTextResponse("Event not found", status_code=404)
+    if since is None:
+        redirect = _redirect_to_job(
+            db, rows, ExportKind.PARTICIPANTS, current_user.id, event_id=event_id, gzip=gzip
+        )
+        if redirect:
+            return redirect
     
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow(["ID", "Full Name", "Email", "Group", "Registered At"])
-    
-    for reg in event.registrations:
-        writer.writerow([
-            reg.user.id, reg.user.full_name, reg.user.email,
-            reg.user.group or "", reg.registered_at.isoformat()
-        ])
+    return _csv_response(
+        ExportService.participants, f"event_{event_id}_participants.csv", event_id, since,
+        gzip=gzip, headers=_delta_headers(since)
+    )
+
+
+@router.get("/participants/archive", response_class=StreamingResponse)
+def export_participants_archive(
+    date_from: Optional[date] = Query(None, alias="from", description="First event day"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last event day, inclusive"),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Export participants of every event in a date range as a ZIP of CSVs (Admin only)"""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'"
+        )
+    start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time()) if date_to else None
     
-    return PlainTextResponse(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=event_{event_id}_participants.csv"}
+    filename = "participants_{}_{}.zip".format(date_from or "start", date_to or "end")
+    return StreamingResponse(
+        stream_participants_archive(start, end),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
-@router.get("/users/csv", response_class=PlainTextResponse)
+@router.get("/users/csv", response_class=StreamingResponse)
 def export_users_csv(
-    current_user: User = Depends(get_current_admin),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    since: Optional[datetime] = Query(None, description=SINCE_DESCRIPTION),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Export all users to CSV (Admin only)"""
-    users = db.query(User).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow(["ID", "Full Name", "Email", "Group", "Role", "Created At"])
-    
-    for u in users:
-        writer.writerow([
-            u.id, u.full_name, u.email, u.group or "",
-            u.role.value, u.created_at.isoformat()
-        ])
-    
-    return PlainTextResponse(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=users.csv"}
+    """Export all users to CSV (Admin only).
+
+    Above EXPORT_JOB_THRESHOLD_ROWS rows a full export redirects to a
+    background job. With `since` only changes are exported and the
+    X-Export-Watermark header holds the value for the next call.
+    """
+    since = _utc(since)
+    if since is None:
+        rows = db.query(func.count(User.id)).scalar()
+        redirect = _redirect_to_job(db, rows, ExportKind.USERS, current_user.id, gzip=gzip)
+        if redirect:
+            return redirect
+    return _csv_response(
+        ExportService.users, "users.csv", since, gzip=gzip, headers=_delta_headers(since)
     )
 
 
 @router.get("/report")
 def get_full_report(
-    current_user: User = Depends(get_current_admin),
+    response: Response,
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get comprehensive system report (Admin only)"""
-    now = datetime.utcnow()
-    month_ago = now - timedelta(days=30)
-    
-    # User stats
-    total_users = db.query(User).count()
-    new_users_month = db.query(User).filter(User.created_at >= month_ago).count()
-    
-    # Event stats
-    total_events = db.query(Event).count()
-    upcoming_events = db.query(Event).filter(Event.date > now).count()
-    
-    # Registration stats
-    total_registrations = db.query(Registration).count()
-    registrations_month = db.query(Registration).filter(
-        Registration.registered_at >= month_ago
-    ).count()
+    """Get comprehensive system report (Admin only).
+
+    "This month" covers the last 30 calendar days. Served from the
+    shared stats cache; X-Cache-Age gives the age of the numbers.
+    """
+    result = cached_stats(("report",), StatsService.report)
+    set_cache_headers(response, result)
+    return result.value
+
+
+@router.post("/jobs", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(
+    job_data: ExportJobCreate,
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Start an export in the background (Admin only)"""
+    job = ExportJobService(db).create(
+        job_data.kind, current_user.id, event_id=job_data.event_id, gzip=job_data.gzip
+    )
+    return _job_response(job)
+
+
+@router.get("/jobs", response_model=List[ExportJobResponse])
+def list_export_jobs(
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """List your most recent export jobs (Admin only)"""
+    return [_job_response(job) for job in ExportJobService(db).list_jobs(current_user.id)]
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+def get_export_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get the status and progress of one of your export jobs (Admin only)"""
+    return _job_response(ExportJobService(db).get(job_id, current_user.id))
+
+
+@router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_export_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Delete one of your finished export jobs and its file (Admin only)"""
+    ExportJobService(db).delete(job_id, current_user.id)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(
+    job_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Download the file of one of your finished export jobs; supports Range requests (Admin only)
+
+    Jobs started by other admins are not found, like in the job list.
+    """
+    job = ExportJobService(db).get(job_id, current_user.id)
+    if job.status == ExportJobStatus.EXPIRED:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export has expired")
+    if job.status != ExportJobStatus.DONE or not job.path or not os.path.exists(job.path):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export is not ready (status: {job.status.value})"
+        )
     
-    # Average registrations per event
-    if total_events > 0:
-        avg_registrations = total_registrations / total_events
-    else:
-        avg_registrations = 0
+    size = os.path.getsize(job.path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename={job.filename}"
+    }
+    media_type = "application/gzip" if job.gzip else (
+        "application/json" if job.kind == ExportKind.REPORT else "text/csv"
+    )
     
-    # Most active group
-    group_stats = db.query(
-        User.group, func.count(Registration.id).label('count')
-    ).join(Registration).filter(User.group.isnot(None)).group_by(
-        User.group
-    ).order_by(func.count(Registration.id).desc()).first()
+    start, end = 0, size - 1
+    status_code = status.HTTP_200_OK
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
     
-    return {
-        "report_date": now.isoformat(),
-        "period": "Last 30 days",
-        "users": {
-            "total": total_users,
-            "new_this_month": new_users_month,
-            "growth_rate": round(new_users_month / max(total_users - new_users_month, 1) * 100, 1)
-        },
-        "events": {
-            "total": total_events,
-            "upcoming": upcoming_events,
-            "average_registrations": round(avg_registrations, 1)
-        },
-        "registrations": {
-            "total": total_registrations,
-            "this_month": registrations_month
-        },
-        "insights": {
-            "most_active_group": group_stats[0] if group_stats else None,
-            "most_active_group_registrations": group_stats[1] if group_stats else 0
-        }
-    }
+    return StreamingResponse(
+        _read_file(job.path, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _parse_range(value: str, size: int):
+    """(start, end) of a single `bytes=` range, or None if it cannot be satisfied"""
+    unit, _, spec = value.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _read_file(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
-from app.models.user import User
 from app.schemas.registration import RegistrationResponse
-from app.services.auth import get_current_user
+from app.services.auth import Principal, get_current_principal
 from app.services.registration_service import RegistrationService
 
 router = APIRouter(prefix="/api/registrations", tags=["Registrations"])
@@ -14,7 +13,7 @@ router = APIRouter(prefix="/api/registrations", tags=["Registrations"])
 @router.post("/{event_id}", response_model=RegistrationResponse, status_code=status.HTTP_201_CREATED)
 def register_for_event(
     event_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Register current user for an event"""
@@ -31,7 +30,7 @@ def register_for_event(
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 def cancel_registration(
     event_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Cancel registration for an event"""
@@ -41,12 +40,29 @@ def cancel_registration(
 
 @router.get("/my", response_model=List[RegistrationResponse])
 def get_my_registrations(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; all registrations when omitted"),
+    cursor: Optional[str] = Query(None, description="Value of a previous X-Next-Cursor header"),
+    with_total: bool = False,
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get all registrations for current user"""
+    """Get registrations for current user.
+
+    With `limit` the result is paged by registration id; the next page's
+    cursor is returned in the `X-Next-Cursor` header.
+    """
     service = RegistrationService(db)
-    registrations = service.get_user_registrations(current_user.id)
+    if limit is None and cursor is None:
+        registrations = service.get_user_registrations(current_user.id)
+    else:
+        registrations, next_cursor = service.get_user_registrations_page(
+            current_user.id, limit or 20, cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        response.headers["X-Total-Count"] = str(service.count_user_registrations(current_user.id))
     return [
         RegistrationResponse(
             id=r.id,
@@ -1,15 +1,45 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from datetime import datetime
+from typing import Optional
+import json
 
-from app.database import get_db
-from app.models.user import User
-from app.models.event import Event
-from app.services.auth import get_current_user
+from app.database import get_db, SessionLocal
+from app.models.event import Event, EventStatus
+from app.models.registration import Registration
+from app.services.auth import Principal, get_current_principal
+from app.services.event_service import EventService
+from app.services.search_service import SearchService, FACETS
+from app.services.autocomplete import autocomplete_index
+from app.services.recommendations import recommendation_engine
+from app.cache import listing_cache
 
 router = APIRouter(prefix="/api/search", tags=["Search"])
 
+# Number of upcoming events cached for suggestions before per-user filtering
+SUGGESTION_CANDIDATES = 50
+SUGGESTION_LIMIT = 5
+
+# Rows read per batch when streaming search results as NDJSON
+STREAM_BATCH_SIZE = 200
+
+SEARCH_FIELDS = (
+    "id", "title", "description", "date", "location", "available_spots",
+    "max_participants", "status", "score", "highlights", "similarity"
+)
+
+
+def _parse_date(value: str):
+    """Parse YYYY-MM-DD; invalid dates are ignored like a missing filter"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
 
 @router.get("/events")
 def search_events(
@@ -18,93 +48,267 @@ def search_events(
     date_from: str = Query(None, description="Filter from date (YYYY-MM-DD)"),
     date_to: str = Query(None, description="Filter to date (YYYY-MM-DD)"),
     has_spots: bool = Query(None, description="Only show events with available spots"),
-    current_user: User = Depends(get_current_user),
+    fuzzy: bool = Query(False, description="Typo-tolerant matching on title and location"),
+    limit: int = Query(20, ge=1, le=100, description="Results per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields, e.g. id,title,date"),
+    facets: Optional[str] = Query(None, description="Comma-separated histograms: location,week,status,spots"),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                                 description="ndjson streams every match, one event per line"),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Advanced event search with multiple filters"""
-    query = db.query(Event)
+    """Advanced event search with multiple filters.
+
+    Results are ranked by relevance (`score`, higher is better) with
+    highlighted title and description snippets (HTML-escaped text with
+    matches in `<mark>`); every word of `q` matches as a prefix. With
+    `fuzzy=true` titles and locations are matched by trigram similarity
+    after case folding, Cyrillic/Latin transliteration and diacritic
+    stripping.
+
+    Results are paged (`limit`, `cursor`); `format=ndjson` streams all
+    matches instead, reading them in batches. `facets` adds per-facet
+    counts over all matches, not just the current page; `results_count`
+    is the number of matches on all pages.
+    """
+    selected = _parse_fields(fields)
+    facet_names = _parse_facets(facets)
+    from_date = _parse_date(date_from)
+    to_date = _parse_date(date_to)
+    filters = (q, location, from_date, to_date, has_spots)
+    include_description = selected is None or "description" in selected
     
-    # Text search in title and description
-    query = query.filter(
-        or_(
-            Event.title.ilike(f"%{q}%"),
-            Event.description.ilike(f"%{q}%")
+    if response_format == "ndjson":
+        return StreamingResponse(
+            _stream_search(filters, fuzzy, selected, include_description),
+            media_type="application/x-ndjson"
         )
-    )
-    
-    # Location filter
-    if location:
-        query = query.filter(Event.location.ilike(f"%{location}%"))
     
-    # Date range filter
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-            query = query.filter(Event.date >= from_date)
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, "%Y-%m-%d")
-            query = query.filter(Event.date <= to_date)
-        except ValueError:
-            pass
-    
-    events = query.order_by(Event.date).all()
+    # Results do not depend on the user, so they are shared between users
+    cache_key = (
+        "search", *EventService(db).list_version(),
+        q, location, date_from, date_to, has_spots, fuzzy, limit, cursor, fields, facets
+    )
+    cached = listing_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Filter by available spots (done in Python since it's a computed property)
-    if has_spots:
-        events = [e for e in events if e.available_spots > 0]
+    service = SearchService(db)
+    items, next_cursor = _search_page(
+        service, filters, fuzzy, limit, cursor, selected, include_description
+    )
+    result = {
+        "query": q,
+        "fuzzy": fuzzy,
+        "results_count": service.count_matches(*filters, fuzzy=fuzzy),  # all pages
+        "next_cursor": next_cursor,
+        "events": items
+    }
+    if facet_names:
+        result["facets"] = service.facet_counts(*filters, facets=facet_names, fuzzy=fuzzy)
+    listing_cache.set(cache_key, result)
+    return result
+
+
+def _parse_fields(fields: Optional[str]):
+    if not fields:
+        return None
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = selected - set(SEARCH_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+                   f"Available: {', '.join(SEARCH_FIELDS)}"
+        )
+    return selected
+
+
+def _parse_facets(facets: Optional[str]):
+    if not facets:
+        return []
+    selected = list(dict.fromkeys(f.strip() for f in facets.split(",") if f.strip()))
+    unknown = set(selected) - set(FACETS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown facets: {', '.join(sorted(unknown))}. "
+                   f"Available: {', '.join(FACETS)}"
+        )
+    return selected
+
+
+def _search_item(e, selected, **extra):
+    item = {
+        "id": e.id,
+        "title": e.title,
+        "description": e.description if selected is None or "description" in selected else None,
+        "date": e.date,
+        "location": e.location,
+        "available_spots": e.available_spots,
+        "max_participants": e.max_participants,
+        "status": e.status.value,
+        **extra
+    }
+    if selected is None:
+        return item
+    return {k: v for k, v in item.items() if k in selected}
+
+
+def _search_page(service, filters, fuzzy, limit, cursor, selected, include_description):
+    if fuzzy:
+        rows, next_cursor = service.fuzzy_search_events(
+            *filters, limit=limit, cursor=cursor, include_description=include_description
+        )
+        items = [_search_item(e, selected, similarity=round(score, 3)) for e, score in rows]
+        return items, next_cursor
     
+    rows, next_cursor = service.search_events(
+        *filters, limit=limit, cursor=cursor, include_description=include_description
+    )
+    items = [
+        _search_item(
+            e, selected,
+            score=round(-score, 4) if score is not None else None,
+            highlights={"title": title_highlight, "description": snippet}
+            if score is not None else None
+        )
+        for e, score, title_highlight, snippet in rows
+    ]
+    return items, next_cursor
+
+
+def _stream_search(filters, fuzzy, selected, include_description):
+    # The request's session may be closed before streaming starts, so the
+    # generator owns its own session and empties it after every batch
+    db = SessionLocal()
+    try:
+        service = SearchService(db)
+        cursor = None
+        while True:
+            items, cursor = _search_page(
+                service, filters, fuzzy, STREAM_BATCH_SIZE, cursor, selected, include_description
+            )
+            db.expunge_all()
+            yield "".join(
+                json.dumps(jsonable_encoder(item), ensure_ascii=False) + "\n" for item in items
+            )
+            if not cursor:
+                break
+    finally:
+        db.close()
+
+
+@router.get("/autocomplete")
+def autocomplete(
+    prefix: str = Query(..., min_length=1, description="Beginning of a title or location word"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Search-as-you-type over event titles and locations.
+
+    Served from an in-memory token index; upcoming, popular events come
+    first. Cyrillic and Latin spellings match each other.
+    """
+    autocomplete_index.sync(db)
     return {
-        "query": q,
-        "results_count": len(events),
-        "events": [
-            {
-                "id": e.id,
-                "title": e.title,
-                "description": e.description,
-                "date": e.date,
-                "location": e.location,
-                "available_spots": e.available_spots,
-                "max_participants": e.max_participants,
-                "status": e.status.value
-            }
-            for e in events
-        ]
+        "prefix": prefix,
+        "results": autocomplete_index.search(prefix, limit)
     }
 
 
 @router.get("/suggestions")
 def get_suggestions(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get event suggestions based on user's group and history"""
-    now = datetime.utcnow()
+    """Get event suggestions based on user's group and history.
+
+    Suggestions come from the recommendation engine (co-registrations of
+    similar students and popularity in the user's group) with a reason
+    and a score; without NumPy/SciPy they are the next upcoming events.
+    """
+    service = EventService(db)
+    recommendation_engine.refresh_if_stale(db)
+    items = recommendation_engine.recommend(current_user.id, current_user.group)
+    if items:
+        ids = [item["event_id"] for item in items]
+        events = {e.id: e for e in db.query(Event).filter(Event.id.in_(ids)).all()}
+        # Lists are precomputed, so re-check what may have changed since
+        registered_ids = service.get_registered_event_ids(current_user.id, ids)
+        suggestions = []
+        for item in items:
+            e = events.get(item["event_id"])
+            if e is None or e.id in registered_ids or e.status != EventStatus.UPCOMING:
+                continue
+            suggestions.append({
+                "id": e.id,
+                "title": e.title,
+                "date": e.date,
+                "location": e.location,
+                "available_spots": e.available_spots,
+                "reason": item["reason"],
+                "score": item["score"]
+            })
+            if len(suggestions) == SUGGESTION_LIMIT:
+                break
+        if suggestions:
+            return {"suggestions": suggestions}
     
-    # Get upcoming events user hasn't registered for
-    registered_event_ids = [
-        r.event_id for r in current_user.registrations
-    ]
+    return {"suggestions": _upcoming_suggestions(db, service, current_user)}
+
+
+def _upcoming_suggestions(db: Session, service: EventService, current_user: Principal):
+    """Next upcoming events the user has not joined"""
+    # Upcoming events are the same for everyone; the user's registrations
+    # are filtered out afterwards
+    cache_key = ("suggestions", *service.list_version())
+    candidates = listing_cache.get(cache_key)
+    if candidates is None:
+        upcoming = db.query(Event).filter(
+            Event.date > datetime.utcnow()
+        ).order_by(Event.date).limit(SUGGESTION_CANDIDATES).all()
+        candidates = [
+            {
+                "id": e.id,
+                "title": e.title,
+                "date": e.date,
+                "location": e.location,
+                "available_spots": e.available_spots,
+                "reason": "Upcoming event you haven't joined yet",
+                "score": None
+            }
+            for e in upcoming
+        ]
+        listing_cache.set(cache_key, candidates)
     
-    suggestions = db.query(Event).filter(
-        Event.date > now,
-        ~Event.id.in_(registered_event_ids) if registered_event_ids else True
-    ).order_by(Event.date).limit(5).all()
+    registered_ids = service.get_registered_event_ids(
+        current_user.id, [c["id"] for c in candidates]
+    )
+    suggestions = [c for c in candidates if c["id"] not in registered_ids][:SUGGESTION_LIMIT]
     
-    return {
-        "suggestions": [
+    if len(suggestions) < SUGGESTION_LIMIT and len(candidates) == SUGGESTION_CANDIDATES:
+        # The user has joined most of the cached candidates; query past them
+        registered = db.query(Registration.event_id).filter(
+            Registration.user_id == current_user.id
+        )
+        events = db.query(Event).filter(
+            Event.date > datetime.utcnow(),
+            ~Event.id.in_(registered)
+        ).order_by(Event.date).limit(SUGGESTION_LIMIT).all()
+        suggestions = [
             {
                 "id": e.id,
                 "title": e.title,
                 "date": e.date,
                 "location": e.location,
                 "available_spots": e.available_spots,
-                "reason": "Upcoming event you haven't joined yet"
+                "reason": "Upcoming event you haven't joined yet",
+                "score": None
             }
-            for e in suggestions
+            for e in events
         ]
-    }
-
+    
+    return suggestions
@@ -1,83 +1,68 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
 
 from app.database import get_db
-from app.models.user import User, UserRole
+from app.models.user import User
 from app.models.event import Event
 from app.models.registration import Registration
-from app.services.auth import get_current_user, get_current_admin
+from app.services.auth import Principal, get_current_user, get_current_principal, get_current_admin
+from app.cache import listing_cache, timeseries_cache, stats_cache, principal_cache, set_cache_headers
+from app.services.stats_service import StatsService, cached_stats
+from app.services.passwords import password_hasher
 
 router = APIRouter(prefix="/api/stats", tags=["Statistics"])
 
+MAX_BULK_EVENT_IDS = 200
+
 
 @router.get("/dashboard")
 def get_dashboard_stats(
-    current_user: User = Depends(get_current_admin),
+    response: Response,
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get dashboard statistics (Admin only)"""
-    total_users = db.query(User).count()
-    total_students = db.query(User).filter(User.role == UserRole.STUDENT).count()
-    total_admins = db.query(User).filter(User.role == UserRole.ADMIN).count()
-    total_events = db.query(Event).count()
-    total_registrations = db.query(Registration).count()
-    
-    # Events by status
-    now = datetime.utcnow()
-    upcoming_events = db.query(Event).filter(Event.date > now).count()
-    finished_events = db.query(Event).filter(Event.date <= now).count()
-    
-    # Recent registrations (last 7 days)
-    week_ago = now - timedelta(days=7)
-    recent_registrations = db.query(Registration).filter(
-        Registration.registered_at >= week_ago
-    ).count()
-    
-    # Most popular events (top 5)
-    popular_events = db.query(
-        Event.id, Event.title,
-        func.count(Registration.id).label('registration_count')
-    ).outerjoin(Registration).group_by(Event.id).order_by(
-        func.count(Registration.id).desc()
-    ).limit(5).all()
-    
-    # Registrations per day (last 7 days)
-    daily_registrations = []
-    for i in range(7):
-        day = now - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        count = db.query(Registration).filter(
-            Registration.registered_at >= day_start,
-            Registration.registered_at < day_end
-        ).count()
-        daily_registrations.append({
-            "date": day_start.strftime("%Y-%m-%d"),
-            "count": count
-        })
+    """Get dashboard statistics (Admin only).
+
+    Served from the shared stats cache; X-Cache-Age gives the age of the
+    numbers in seconds.
+    """
+    result = cached_stats(("dashboard",), StatsService.dashboard)
+    set_cache_headers(response, result)
+    return result.value
+
+
+@router.get("/timeseries")
+def get_timeseries(
+    metric: Literal["registrations", "users", "events"] = "registrations",
+    start: Optional[date] = Query(None, alias="from", description="First day (default: 30 days ago)"),
+    end: Optional[date] = Query(None, alias="to", description="Last day, inclusive (default: today)"),
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get zero-filled counts of a metric per time bucket (Admin only)"""
+    today = datetime.utcnow().date()
+    end = end or today
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'"
+        )
     
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    buckets = StatsService(db).timeseries(metric, range_start, range_end, granularity)
     return {
-        "users": {
-            "total": total_users,
-            "students": total_students,
-            "admins": total_admins
-        },
-        "events": {
-            "total": total_events,
-            "upcoming": upcoming_events,
-            "finished": finished_events
-        },
-        "registrations": {
-            "total": total_registrations,
-            "last_7_days": recent_registrations,
-            "daily": daily_registrations
-        },
-        "popular_events": [
-            {"id": e.id, "title": e.title, "registrations": e.registration_count}
-            for e in popular_events
-        ]
+        "metric": metric,
+        "granularity": granularity,
+        "from": start,
+        "to": end,
+        "total": sum(b["count"] for b in buckets),
+        "buckets": buckets
     }
 
 
@@ -87,23 +72,19 @@ def get_user_stats(
     db: Session = Depends(get_db)
 ):
     """Get current user's statistics"""
-    total_registrations = db.query(Registration).filter(
-        Registration.user_id == current_user.id
-    ).count()
+    total_registrations = current_user.registration_count
     
     now = datetime.utcnow()
-    upcoming_events = db.query(Registration).join(Event).filter(
+    upcoming_events = db.query(func.count(Registration.id)).join(Event).filter(
         Registration.user_id == current_user.id,
         Event.date > now
-    ).count()
-    
-    attended_events = db.query(Registration).join(Event).filter(
-        Registration.user_id == current_user.id,
-        Event.date <= now
-    ).count()
+    ).scalar()
+    attended_events = total_registrations - upcoming_events
     
     # Recent activity
-    recent = db.query(Registration).filter(
+    recent = db.query(
+        Registration.event_id, Event.title, Registration.registered_at
+    ).join(Event).filter(
         Registration.user_id == current_user.id
     ).order_by(Registration.registered_at.desc()).limit(5).all()
     
@@ -114,7 +95,7 @@ def get_user_stats(
         "recent_registrations": [
             {
                 "event_id": r.event_id,
-                "event_title": r.event.title,
+                "event_title": r.title,
                 "registered_at": r.registered_at
             }
             for r in recent
@@ -122,69 +103,104 @@ def get_user_stats(
     }
 
 
+@router.get("/events")
+def get_events_stats(
+    response: Response,
+    ids: str = Query(..., description="Comma-separated event ids"),
+    current_user: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get statistics for several events at once (Admin only)"""
+    try:
+        event_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if len(event_ids) > MAX_BULK_EVENT_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_EVENT_IDS} ids per request"
+        )
+    
+    key = tuple(sorted(set(event_ids)))
+    result = cached_stats(("events",) + key, lambda service: service.event_stats(key))
+    set_cache_headers(response, result)
+    stats = result.value
+    return {
+        "events": [stats[event_id] for event_id in dict.fromkeys(event_ids) if event_id in stats],
+        "missing": [event_id for event_id in dict.fromkeys(event_ids) if event_id not in stats]
+    }
+
+
 @router.get("/events/{event_id}/stats")
 def get_event_stats(
     event_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get statistics for a specific event (Admin only)"""
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    stats = StatsService(db).event_stats([event_id])
+    if event_id not in stats:
         return {"error": "Event not found"}
-    
-    registrations = db.query(Registration).filter(
-        Registration.event_id == event_id
-    ).all()
-    
-    # Group distribution
-    groups = {}
-    for reg in registrations:
-        group = reg.user.group or "No Group"
-        groups[group] = groups.get(group, 0) + 1
-    
-    # Registration timeline
-    timeline = {}
-    for reg in registrations:
-        date = reg.registered_at.strftime("%Y-%m-%d")
-        timeline[date] = timeline.get(date, 0) + 1
-    
-    return {
-        "event_id": event_id,
-        "title": event.title,
-        "total_registrations": len(registrations),
-        "capacity": event.max_participants,
-        "fill_rate": round(len(registrations) / event.max_participants * 100, 1),
-        "group_distribution": groups,
-        "registration_timeline": timeline
-    }
+    return stats[event_id]
 
 
 @router.get("/leaderboard")
 def get_leaderboard(
-    current_user: User = Depends(get_current_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    group: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Get most active students leaderboard"""
-    leaderboard = db.query(
-        User.id, User.full_name, User.group,
-        func.count(Registration.id).label('event_count')
-    ).join(Registration).filter(
-        User.role == UserRole.STUDENT
-    ).group_by(User.id).order_by(
-        func.count(Registration.id).desc()
-    ).limit(10).all()
+    """Get most active students leaderboard, optionally within one group"""
+    leaderboard, total = StatsService(db).leaderboard(skip, limit, group)
     
     return {
+        "total": total,
         "leaderboard": [
             {
-                "rank": i + 1,
+                "rank": skip + i + 1,
                 "user_id": u.id,
                 "name": u.full_name,
                 "group": u.group,
-                "events_attended": u.event_count
+                "events_attended": u.registration_count
             }
             for i, u in enumerate(leaderboard)
         ]
     }
 
+
+@router.get("/leaderboard/me")
+def get_my_rank(
+    group: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the current user's leaderboard position (null if not ranked)"""
+    return {
+        "rank": StatsService(db).leaderboard_rank(current_user, group),
+        "user_id": current_user.id,
+        "name": current_user.full_name,
+        "group": current_user.group,
+        "events_attended": current_user.registration_count
+    }
+
+
+@router.get("/cache")
+def get_cache_stats(current_user: Principal = Depends(get_current_admin)):
+    """Get hit/miss/eviction counters of the in-process caches (Admin only)"""
+    return {
+        "listing": listing_cache.stats(),
+        "timeseries": timeseries_cache.stats(),
+        "stats": stats_cache.stats(),
+        "principal": principal_cache.stats()
+    }
+
+
+@router.get("/password-hashing")
+def get_password_hashing_stats(current_user: Principal = Depends(get_current_admin)):
+    """Get queue depth and throughput of the bcrypt process pool (Admin only)"""
+    return password_hasher.stats()
@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
-from app.services.auth import get_current_user, get_current_admin
+from app.services.auth import Principal, get_current_user, get_current_principal, get_current_admin
 from app.services.user_service import UserService
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
+# Larger `limit` values are capped rather than rejected, as the parameter
+# used to be unbounded
+MAX_USERS_PAGE = 1000
+
 
 @router.get("/me", response_model=UserResponse)
 def get_current_user_profile(current_user: User = Depends(get_current_user)):
@@ -20,7 +24,7 @@ def get_current_user_profile(current_user: User = Depends(get_current_user)):
 @router.put("/me", response_model=UserResponse)
 def update_current_user(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update current user profile"""
@@ -30,12 +34,24 @@ def update_current_user(
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_admin),
+    limit: int = Query(100, ge=1, description=f"Page size, capped at {MAX_USERS_PAGE}"),
+    cursor: Optional[str] = Query(None, description="Value of a previous X-Next-Cursor header"),
+    with_total: bool = False,
+    current_user: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """Get all users (Admin only)"""
+    """Get all users (Admin only), ordered by id.
+
+    The next page's cursor is returned in the `X-Next-Cursor` header and,
+    with `with_total=true`, the user count in `X-Total-Count`.
+    """
     service = UserService(db)
-    return service.get_all_users(skip, limit)
+    users, next_cursor = service.get_all_users(skip, min(limit, MAX_USERS_PAGE), cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        response.headers["X-Total-Count"] = str(service.count_users())
+    return users
 
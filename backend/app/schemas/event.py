@@ -52,7 +52,8 @@ class EventResponse(BaseModel):
 
 class EventListResponse(BaseModel):
     events: List[EventResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
 
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from app.models.export_job import ExportKind, ExportJobStatus
+
+
+class ExportJobCreate(BaseModel):
+    kind: ExportKind
+    event_id: Optional[int] = None  # required for participants
+    gzip: bool = False
+
+
+class ExportJobResponse(BaseModel):
+    id: str
+    kind: ExportKind
+    event_id: Optional[int]
+    status: ExportJobStatus
+    progress: int
+    total: Optional[int]
+    filename: str
+    size: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
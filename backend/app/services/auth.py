@@ -1,29 +1,26 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Annotated
+from typing import Optional, Annotated, NamedTuple, Tuple
 from jose import JWTError, jwt
-import bcrypt
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status, Header
 
+from app.cache import principal_cache
 from app.config import settings
 from app.database import get_db
 from app.models.user import User, UserRole
+from app.services.passwords import check_password, hash_password
 
 ADMIN_SECRET_KEY = "111111"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
-    )
+    """Inline check for scripts; request handlers use `password_hasher`"""
+    return check_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(
-        password.encode('utf-8'),
-        bcrypt.gensalt()
-    ).decode('utf-8')
+    return hash_password(password, settings.BCRYPT_ROUNDS)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -36,43 +33,89 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
-async def get_current_user(
-    authorization: Annotated[Optional[str], Header(convert_underscores=False)] = None,
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+class Principal(NamedTuple):
+    """The authenticated user's identity, without the ORM row"""
+    id: int
+    role: UserRole
+    group: Optional[str]
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Forget cached principals of a user; call after changing their role or group"""
+    principal_cache.invalidate(where_value=lambda value: value[0].id == user_id)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    if not authorization:
-        raise credentials_exception
-    
-    try:
-        parts = authorization.split()
-        if len(parts) != 2 or parts[0].lower() != "bearer":
-            raise credentials_exception
-        token = parts[1]
-    except Exception:
-        raise credentials_exception
-    
+
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    parts = authorization.split() if authorization else []
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        raise _credentials_exception()
+    return parts[1]
+
+
+def _decode_token(token: str) -> Tuple[int, float]:
+    """User id and expiry (a Unix timestamp) of a valid token"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)
+            raise _credentials_exception()
+        return int(user_id), float(payload.get("exp") or 0)
     except (JWTError, ValueError):
-        raise credentials_exception
+        raise _credentials_exception()
 
+
+def _remember(token: str, principal: Principal, expires: float) -> None:
+    principal_cache.set(token, (principal, expires))
+
+
+def get_current_user(
+    authorization: Annotated[Optional[str], Header(convert_underscores=False)] = None,
+    db: Session = Depends(get_db)
+) -> User:
+    # A plain def: FastAPI runs it in the threadpool, so the blocking user
+    # lookup never stalls the event loop
+    token = _bearer_token(authorization)
+    user_id, expires = _decode_token(token)
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _remember(token, Principal(user.id, user.role, user.group), expires)
     return user
 
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_principal(
+    authorization: Annotated[Optional[str], Header(convert_underscores=False)] = None,
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Id, role and group of the caller, for endpoints that need no more.
+
+    Verified tokens are cached until they expire (at most
+    PRINCIPAL_CACHE_TTL), so repeat requests skip both the JWT decode and
+    the user lookup.
+    """
+    token = _bearer_token(authorization)
+    cached = principal_cache.get(token)
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+
+    user_id, expires = _decode_token(token)
+    row = db.query(User.id, User.role, User.group).filter(User.id == user_id).first()
+    if row is None:
+        raise _credentials_exception()
+    principal = Principal(*row)
+    _remember(token, principal, expires)
+    return principal
+
+
+async def get_current_admin(current_user: Principal = Depends(get_current_principal)) -> Principal:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,152 @@
+import bisect
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.event import Event
+from app.services.revision_service import RevisionService
+from app.services.text_normalize import normalize_text
+
+
+class AutocompleteIndex:
+    """In-memory prefix index over normalized event title and location tokens.
+
+    Tokens live in one sorted list of (token, event_id) pairs, so a
+    prefix lookup is two bisections plus a slice. The index is built at
+    startup and patched by EventService/RegistrationService on writes;
+    `revision` is the events revision it reflects, and `sync()` rebuilds
+    it when another worker has written in the meantime.
+    """
+
+    def __init__(self):
+        self._tokens: List[Tuple[str, int]] = []
+        # event_id -> (title, location, date, popularity, tokens, timestamp)
+        self._events: Dict[int, tuple] = {}
+        self._lock = threading.RLock()
+        self.revision: Optional[int] = None
+        self._checked_at = 0.0
+
+    def build(self, db: Session) -> None:
+        revision = RevisionService(db).get_events_revision()
+        rows = db.query(
+            Event.id, Event.title, Event.location, Event.date, Event.registration_count
+        ).all()
+        tokens, events = [], {}
+        for event_id, title, location, date, popularity in rows:
+            event_tokens = _tokenize(title, location)
+            events[event_id] = (title, location, date, popularity, event_tokens, _timestamp(date))
+            tokens.extend((t, event_id) for t in event_tokens)
+        tokens.sort()
+        with self._lock:
+            self._tokens, self._events = tokens, events
+            self.revision = revision
+            self._checked_at = time.monotonic()
+
+    def sync(self, db: Session) -> None:
+        """Rebuild if the database moved on without us, checked at most every few seconds"""
+        now = time.monotonic()
+        if self.revision is not None and now - self._checked_at < settings.AUTOCOMPLETE_SYNC_SECONDS:
+            return
+        self._checked_at = now
+        if RevisionService(db).get_events_revision() != self.revision:
+            self.build(db)
+
+    def upsert(self, event: Event) -> None:
+        with self._lock:
+            self._remove(event.id)
+            event_tokens = _tokenize(event.title, event.location)
+            self._events[event.id] = (
+                event.title, event.location, event.date, event.registration_count or 0,
+                event_tokens, _timestamp(event.date)
+            )
+            for token in event_tokens:
+                bisect.insort(self._tokens, (token, event.id))
+
+    def remove(self, event_id: int) -> None:
+        with self._lock:
+            self._remove(event_id)
+
+    def adjust_popularity(self, event_id: int, delta: int) -> None:
+        with self._lock:
+            entry = self._events.get(event_id)
+            if entry:
+                title, location, date, popularity, tokens, timestamp = entry
+                self._events[event_id] = (title, location, date, popularity + delta, tokens, timestamp)
+
+    def advance(self, db: Session) -> None:
+        """Record a local write that has already been applied to the index.
+
+        If the revision moved by more than our own bump, another worker
+        wrote too, and the index is left stale for the next sync().
+        """
+        revision = RevisionService(db).get_events_revision()
+        with self._lock:
+            if self.revision is not None and revision == self.revision + 1:
+                self.revision = revision
+
+    def search(self, prefix: str, limit: int = 10) -> List[dict]:
+        words = normalize_text(prefix).split()
+        if not words:
+            return []
+        with self._lock:
+            # Every word must prefix some token; the last one is usually still
+            # being typed. Normalized tokens are [a-z0-9], and "{" sorts after "z".
+            matches = None
+            for word in words:
+                start = bisect.bisect_left(self._tokens, (word, -1))
+                end = bisect.bisect_left(self._tokens, (word + "{", -1))
+                ids = {event_id for _, event_id in self._tokens[start:end]}
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+            now = _timestamp(datetime.utcnow())
+            events = self._events
+            best = heapq.nsmallest(limit, matches, key=lambda i: _rank(events[i], now))
+            return [
+                {
+                    "id": event_id,
+                    "title": self._events[event_id][0],
+                    "location": self._events[event_id][1],
+                    "date": self._events[event_id][2],
+                    "registrations": self._events[event_id][3],
+                }
+                for event_id in best
+            ]
+
+    def _remove(self, event_id: int) -> None:
+        entry = self._events.pop(event_id, None)
+        if not entry:
+            return
+        for token in entry[4]:
+            i = bisect.bisect_left(self._tokens, (token, event_id))
+            if i < len(self._tokens) and self._tokens[i] == (token, event_id):
+                del self._tokens[i]
+
+
+def _tokenize(title: str, location: str) -> List[str]:
+    return sorted(set(normalize_text(f"{title} {location}").split()))
+
+
+_EPOCH = datetime(1970, 1, 1)
+_WEEK_SECONDS = 7 * 24 * 3600.0
+
+
+def _timestamp(date: datetime) -> float:
+    return (date - _EPOCH).total_seconds()
+
+
+def _rank(entry: tuple, now: float) -> float:
+    """Lower is better: upcoming events (negative, soonest and most popular
+    first), then past events (positive, newest first)"""
+    timestamp, popularity = entry[5], entry[3]
+    if timestamp >= now:
+        return -(popularity + 1) / (1 + (timestamp - now) / _WEEK_SECONDS)
+    return now - timestamp
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.event import Event
+from app.models.registration import Registration
+from app.models.tombstone import Tombstone
+from app.models.user import User
+
+EVENT = "event"
+USER = "user"
+REGISTRATION = "registration"
+
+
+def next_watermark() -> datetime:
+    """Watermark for the next delta export.
+
+    updated_at and deleted_at are stamped before their transaction
+    commits, so the watermark is EXPORT_WATERMARK_LAG_SECONDS behind now.
+    Rows committed within the lag of their stamp may be sent twice. A
+    transaction that commits later than that is already behind the
+    watermark once visible: its changes only reach a full export.
+    """
+    return datetime.utcnow() - timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS)
+
+
+class ChangeService:
+    """Tombstones for deleted rows and updated_at maintenance.
+
+    Writes are staged in the caller's transaction (no commit).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_deletion(self, entity: str, entity_id: int,
+                        event_id: Optional[int] = None, user_id: Optional[int] = None) -> None:
+        self.db.add(Tombstone(entity=entity, entity_id=entity_id, event_id=event_id, user_id=user_id))
+
+    def record_event_deletion(self, event_id: int) -> None:
+        """Tombstone an event and, in one statement, all of its registrations"""
+        now = datetime.utcnow()
+        self.db.execute(
+            insert(Tombstone).from_select(
+                ["entity", "entity_id", "event_id", "user_id", "deleted_at"],
+                select(
+                    literal(REGISTRATION), Registration.id, Registration.event_id,
+                    Registration.user_id, literal(now)
+                ).where(Registration.event_id == event_id)
+            )
+        )
+        self.db.add(Tombstone(entity=EVENT, entity_id=event_id, deleted_at=now))
+
+    @staticmethod
+    def deleted_since(entity: str, since: datetime, event_id: Optional[int] = None):
+        """Select of (id, entity_id, user_id, deleted_at) for deletions at or after `since`"""
+        stmt = select(
+            Tombstone.id, Tombstone.entity_id, Tombstone.user_id, Tombstone.deleted_at
+        ).where(Tombstone.entity == entity, Tombstone.deleted_at >= since)
+        if event_id is not None:
+            stmt = stmt.where(Tombstone.event_id == event_id)
+        return stmt
+
+    def prune(self, older_than: datetime) -> int:
+        count = self.db.query(Tombstone).filter(
+            Tombstone.deleted_at < older_than
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return count
+
+    def backfill_updated_at(self) -> None:
+        """Seed updated_at on rows written before the column existed"""
+        sources = [
+            (User, User.created_at),
+            (Event, Event.created_at),
+            (Registration, Registration.registered_at),
+        ]
+        for model, source in sources:
+            self.db.query(model).filter(model.updated_at.is_(None)).update(
+                {model.updated_at: source},
+                synchronize_session=False
+            )
+        self.db.commit()
@@ -1,15 +1,29 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from fastapi import HTTPException, status
 from datetime import datetime
-from typing import Optional
-from app.models.event import Event
+from typing import Optional, Iterable, Set
+from app.models.event import Event, EventStatus
 from app.models.registration import Registration
 from app.schemas.event import EventCreate, EventUpdate
+from app.pagination import keyset_paginate
+from app.cache import invalidate_listings
+from app.services.search_service import SearchService
+from app.services.autocomplete import autocomplete_index
+from app.services.revision_service import RevisionService, EVENTS_REVISION
+from app.services.rollup_service import RollupService
+from app.services.change_service import ChangeService
+from app.services.stats_service import invalidate_timeseries
+from app.models.revision import Revision
 
 
 class EventService:
     def __init__(self, db: Session):
         self.db = db
+        self.revisions = RevisionService(db)
+        self.search = SearchService(db)
+        self.rollups = RollupService(db)
+        self.changes = ChangeService(db)
 
     def create_event(self, event_data: EventCreate, created_by: int) -> Event:
         event = Event(
@@ -21,8 +35,15 @@ class EventService:
             created_by=created_by
         )
         self.db.add(event)
+        self.db.flush()
+        self.search.index_event(event)
+        self.rollups.event_added()
+        self.revisions.bump()
         self.db.commit()
+        invalidate_listings(self.revisions.get_events_revision())
         self.db.refresh(event)
+        autocomplete_index.upsert(event)
+        autocomplete_index.advance(self.db)
         return event
 
     def get_event(self, event_id: int) -> Event:
@@ -35,22 +56,28 @@ class EventService:
         self,
         skip: int = 0,
         limit: int = 20,
-        status_filter: Optional[str] = None,
-        search: Optional[str] = None
+        status_filter: Optional[EventStatus] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ):
         query = self.db.query(Event)
         
         if search:
             query = query.filter(Event.title.ilike(f"%{search}%"))
         
-        total = query.count()
-        events = query.order_by(Event.date.desc()).offset(skip).limit(limit).all()
-        
-        # Filter by status after fetching (since status is computed)
         if status_filter:
-            events = [e for e in events if e.status.value == status_filter]
+            query = query.filter(Event.status_filter(status_filter))
+        
+        total = query.count() if with_total else None
+        events, next_cursor = keyset_paginate(
+            query, [Event.date, Event.id], limit,
+            cursor=cursor,
+            offset=0 if cursor else skip,
+            descending=True
+        )
         
-        return events, total
+        return events, total, next_cursor
 
     def update_event(self, event_id: int, event_data: EventUpdate) -> Event:
         event = self.get_event(event_id)
@@ -59,14 +86,60 @@ class EventService:
         for field, value in update_data.items():
             setattr(event, field, value)
         
+        if "title" in update_data or "location" in update_data:
+            self.search.index_event(event)
+        event.revision = Event.revision + 1
+        self.revisions.bump()
         self.db.commit()
+        invalidate_listings(self.revisions.get_events_revision())
         self.db.refresh(event)
+        autocomplete_index.upsert(event)
+        autocomplete_index.advance(self.db)
         return event
 
     def delete_event(self, event_id: int) -> None:
         event = self.get_event(event_id)
+        created_at = event.created_at
+        self.rollups.event_removed(event_id)
+        self.changes.record_event_deletion(event_id)
+        # Bulk delete so the registrations collection is never loaded
+        self.db.query(Registration).filter(
+            Registration.event_id == event_id
+        ).delete(synchronize_session=False)
+        self.search.remove_event(event_id)
+        event.registration_count = 0
         self.db.delete(event)
+        self.revisions.bump()
         self.db.commit()
+        invalidate_listings(self.revisions.get_events_revision())
+        invalidate_timeseries("events", at=created_at)
+        invalidate_timeseries("registrations")
+        autocomplete_index.remove(event_id)
+        autocomplete_index.advance(self.db)
+
+    def list_version(self):
+        """Cheap stamp that changes whenever an event listing can change.
+
+        Combines the global events revision with the date of the next
+        event to finish, since status flips to "finished" without any
+        write. That date moves on exactly when an event finishes and is
+        a single seek on ix_events_date_id, however long the history.
+        """
+        now = datetime.utcnow()
+        revision = select(Revision.value).where(
+            Revision.name == EVENTS_REVISION
+        ).scalar_subquery()
+        next_to_finish = select(Event.date).where(
+            Event.date >= now
+        ).order_by(Event.date).limit(1).scalar_subquery()
+        return tuple(self.db.execute(select(revision, next_to_finish)).one())
+
+    def event_version(self, event_id: int):
+        """Stamp for a single event without loading it, or None if it does not exist"""
+        row = self.db.query(Event.revision, Event.date).filter(Event.id == event_id).first()
+        if row is None:
+            return None
+        return row.revision, row.date < datetime.utcnow()
 
     def is_user_registered(self, event_id: int, user_id: int) -> bool:
         return self.db.query(Registration).filter(
@@ -74,6 +147,17 @@ class EventService:
             Registration.user_id == user_id
         ).first() is not None
 
+    def get_registered_event_ids(self, user_id: int, event_ids: Iterable[int]) -> Set[int]:
+        """Return the subset of `event_ids` the user is registered for, in one query"""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return set()
+        rows = self.db.query(Registration.event_id).filter(
+            Registration.user_id == user_id,
+            Registration.event_id.in_(event_ids)
+        ).all()
+        return {event_id for (event_id,) in rows}
+
     def get_event_participants(self, event_id: int):
         event = self.get_event(event_id)
         return [
@@ -87,3 +171,39 @@ class EventService:
             for reg in event.registrations
         ]
 
+
+    def reconcile_registration_counts(self, fix: bool = False):
+        """Compare Event.registration_count with the registrations table.
+
+        Returns a list of mismatches; with `fix=True` the stored counters
+        are overwritten with the actual counts.
+        """
+        actual = self.db.query(
+            Registration.event_id,
+            func.count(Registration.id).label("count")
+        ).group_by(Registration.event_id).subquery()
+        actual_count = func.coalesce(actual.c.count, 0)
+
+        rows = self.db.query(
+            Event.id, Event.registration_count, actual_count
+        ).outerjoin(actual, actual.c.event_id == Event.id).filter(
+            Event.registration_count != actual_count
+        ).all()
+
+        mismatches = [
+            {"event_id": event_id, "stored": stored, "actual": count}
+            for event_id, stored, count in rows
+        ]
+        if fix and mismatches:
+            for m in mismatches:
+                self.db.query(Event).filter(Event.id == m["event_id"]).update(
+                    {
+                        Event.registration_count: m["actual"],
+                        Event.revision: Event.revision + 1
+                    },
+                    synchronize_session=False
+                )
+            self.revisions.bump()
+            self.db.commit()
+            invalidate_listings(self.revisions.get_events_revision())
+        return mismatches
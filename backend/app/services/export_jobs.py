@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.event import Event
+from app.models.export_job import ExportJob, ExportJobStatus, ExportKind
+from app.models.user import User
+from app.services.export_service import EXPORT_BATCH_SIZE, ExportService, csv_chunks, gzip_chunks
+from app.services.stats_service import StatsService
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE = (ExportJobStatus.QUEUED, ExportJobStatus.RUNNING)
+_worker_ids = {}
+
+
+def worker_id() -> str:
+    """Identifies this process in `export_jobs.worker`.
+
+    The random suffix tells a restarted process from its predecessor even
+    when the pid is reused; keying by pid gives forked workers their own.
+    """
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _worker_ids[pid]
+
+_CSV_EXPORTS = {
+    ExportKind.EVENTS: ExportService.events,
+    ExportKind.USERS: ExportService.users,
+    ExportKind.PARTICIPANTS: ExportService.participants,
+}
+
+
+def export_filename(kind: ExportKind, event_id: int = None, gzip: bool = False) -> str:
+    if kind == ExportKind.REPORT:
+        name = "report.json"
+    elif kind == ExportKind.PARTICIPANTS:
+        name = f"event_{event_id}_participants.csv"
+    else:
+        name = f"{kind.value}.csv"
+    return name + ".gz" if gzip else name
+
+
+class ExportJobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, kind: ExportKind, created_by: int, event_id: int = None, gzip: bool = False) -> ExportJob:
+        if kind == ExportKind.PARTICIPANTS:
+            if event_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="event_id is required for participants exports"
+                )
+            if self.db.query(Event.id).filter(Event.id == event_id).first() is None:
+                raise HTTPException(status_code=404, detail="Event not found")
+        else:
+            event_id = None
+
+        self.cleanup_expired()
+        self.fail_interrupted()
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            event_id=event_id,
+            gzip=gzip,
+            filename=export_filename(kind, event_id, gzip),
+            created_by=created_by,
+            worker=worker_id(),
+            heartbeat_at=datetime.utcnow()
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        export_worker.submit(job.id)
+        return job
+
+    def get(self, job_id: str, created_by: Optional[int] = None) -> ExportJob:
+        """Fetch a job; with `created_by`, jobs of other users are not found"""
+        query = self.db.query(ExportJob).filter(ExportJob.id == job_id)
+        if created_by is not None:
+            query = query.filter(ExportJob.created_by == created_by)
+        job = query.first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Export job not found")
+        if job.status == ExportJobStatus.DONE and job.expires_at <= datetime.utcnow():
+            self._expire(job)
+            self.db.commit()
+        elif job.status in _ACTIVE and _is_stale(job.heartbeat_at):
+            self.fail_interrupted()
+            self.db.refresh(job)
+        return job
+
+    def list_jobs(self, created_by: int, limit: int = 20) -> List[ExportJob]:
+        return self.db.query(ExportJob).filter(
+            ExportJob.created_by == created_by
+        ).order_by(ExportJob.created_at.desc()).limit(limit).all()
+
+    def delete(self, job_id: str, created_by: Optional[int] = None) -> None:
+        job = self.get(job_id, created_by)
+        if job.status in _ACTIVE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Export job is still running"
+            )
+        _remove_file(job.path)
+        self.db.delete(job)
+        self.db.commit()
+
+    def cleanup_expired(self) -> int:
+        """Delete the files of expired exports; the job rows are kept as "expired" """
+        jobs = self.db.query(ExportJob).filter(
+            ExportJob.status == ExportJobStatus.DONE,
+            ExportJob.expires_at <= datetime.utcnow()
+        ).all()
+        for job in jobs:
+            self._expire(job)
+        if jobs:
+            self.db.commit()
+        return len(jobs)
+
+    def fail_interrupted(self) -> int:
+        """Mark queued or running jobs whose process stopped heartbeating as failed.
+
+        Jobs of other live processes keep beating and are left alone, so
+        this is safe with several workers and during rolling restarts.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.EXPORT_JOB_HEARTBEAT_TIMEOUT)
+        count = self.db.query(ExportJob).filter(
+            ExportJob.status.in_(_ACTIVE),
+            or_(ExportJob.heartbeat_at.is_(None), ExportJob.heartbeat_at < stale_before)
+        ).update(
+            {
+                ExportJob.status: ExportJobStatus.FAILED,
+                ExportJob.error: "Interrupted: the export worker stopped responding",
+                ExportJob.finished_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        self.db.commit()
+        return count
+
+    def _expire(self, job: ExportJob) -> None:
+        _remove_file(job.path)
+        job.status = ExportJobStatus.EXPIRED
+        job.path = None
+
+
+class ExportWorker:
+    """Runs export jobs on a small thread pool, each with its own session.
+
+    While any job of this process is queued or running, a heartbeat
+    thread vouches for them every third of EXPORT_JOB_HEARTBEAT_TIMEOUT,
+    so a long report or a slow batch query is not taken for a dead worker.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stop = None
+
+    def submit(self, job_id: str) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="export"
+                )
+                self._stop = threading.Event()
+                threading.Thread(
+                    target=self._beat, args=(self._stop,), name="export-heartbeat", daemon=True
+                ).start()
+            self._pending += 1
+        self._executor.submit(self._run, job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._stop.set()
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _beat(self, stop: threading.Event) -> None:
+        while not stop.wait(settings.EXPORT_JOB_HEARTBEAT_TIMEOUT / 3):
+            if not self._pending:
+                continue
+            db = SessionLocal()
+            try:
+                _heartbeat(db)
+                db.commit()
+            except Exception:
+                # The next beat retries; a job is only failed after a whole timeout
+                logger.exception("Export heartbeat failed")
+            finally:
+                db.close()
+
+    def _run(self, job_id: str) -> None:
+        try:
+            self._run_job(job_id)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _run_job(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+            if job is None or job.status != ExportJobStatus.QUEUED:
+                return
+            job.status = ExportJobStatus.RUNNING
+            job.started_at = job.heartbeat_at = datetime.utcnow()
+            job.worker = worker_id()
+            job.total = _expected_rows(db, job)
+            db.commit()
+
+            os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+            path = os.path.join(settings.EXPORT_DIR, f"{job.id}-{job.filename}")
+            try:
+                size = self._write(db, job, path)
+            except Exception as exc:
+                logger.exception("Export job %s failed", job_id)
+                db.rollback()
+                _remove_file(path + ".part")
+                job.status = ExportJobStatus.FAILED
+                job.error = str(exc) or exc.__class__.__name__
+                job.finished_at = datetime.utcnow()
+                db.commit()
+                return
+
+            finished_at = datetime.utcnow()
+            # Only if nobody failed the job as abandoned meanwhile
+            done = db.query(ExportJob).filter(
+                ExportJob.id == job.id, ExportJob.status == ExportJobStatus.RUNNING
+            ).update(
+                {
+                    ExportJob.status: ExportJobStatus.DONE,
+                    ExportJob.path: path,
+                    ExportJob.size: size,
+                    ExportJob.progress: job.progress,
+                    ExportJob.finished_at: finished_at,
+                    ExportJob.heartbeat_at: finished_at,
+                    ExportJob.expires_at: finished_at + timedelta(seconds=settings.EXPORT_JOB_TTL)
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            if not done:
+                _remove_file(path)
+        finally:
+            db.close()
+
+    def _write(self, db: Session, job: ExportJob, path: str) -> int:
+        """Write the export to `path` (via a .part file) and return its size"""
+        if job.kind == ExportKind.REPORT:
+            report = json.dumps(jsonable_encoder(StatsService(db).report()), ensure_ascii=False)
+            chunks: Iterable[bytes] = [report.encode("utf-8")]
+            job.progress = 1
+        else:
+            export = _CSV_EXPORTS[job.kind]
+            args = (job.event_id,) if job.kind == ExportKind.PARTICIPANTS else ()
+            chunks = csv_chunks(self._counted(db, job, export(ExportService(db), *args)))
+        if job.gzip:
+            chunks = gzip_chunks(chunks)
+
+        with open(path + ".part", "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(path + ".part", path)
+        return os.path.getsize(path)
+
+    def _counted(self, db: Session, job: ExportJob, rows: Iterator[list]) -> Iterator[list]:
+        """Pass rows through, recording progress after every batch"""
+        written = 0
+        for row in rows:
+            yield row
+            written += 1
+            if written % EXPORT_BATCH_SIZE == 0:
+                job.progress = written - 1  # without the header
+                _heartbeat(db)
+                db.commit()
+        job.progress = max(written - 1, 0)
+
+
+def _expected_rows(db: Session, job: ExportJob) -> int:
+    if job.kind == ExportKind.EVENTS:
+        return db.query(func.count(Event.id)).scalar()
+    if job.kind == ExportKind.USERS:
+        return db.query(func.count(User.id)).scalar()
+    if job.kind == ExportKind.PARTICIPANTS:
+        return db.query(Event.registration_count).filter(Event.id == job.event_id).scalar() or 0
+    return 1
+
+
+def _heartbeat(db: Session) -> None:
+    """Vouch for every active job of this process, including queued ones"""
+    db.query(ExportJob).filter(
+        ExportJob.worker == worker_id(), ExportJob.status.in_(_ACTIVE)
+    ).update({ExportJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def _is_stale(heartbeat_at) -> bool:
+    return heartbeat_at is None or (
+        datetime.utcnow() - heartbeat_at
+    ).total_seconds() > settings.EXPORT_JOB_HEARTBEAT_TIMEOUT
+
+
+def _remove_file(path) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+export_worker = ExportWorker(settings.EXPORT_WORKERS)
@@ -0,0 +1,259 @@
+import csv
+import io
+import zipfile
+import zlib
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.event import Event
+from app.models.registration import Registration
+from app.models.tombstone import Tombstone
+from app.models.user import User
+from app.services.change_service import ChangeService, EVENT, USER, REGISTRATION
+
+EXPORT_BATCH_SIZE = 1000
+
+EVENTS_HEADER = [
+    "ID", "Title", "Description", "Date", "Location",
+    "Max Participants", "Current Participants", "Status", "Created At"
+]
+USERS_HEADER = ["ID", "Full Name", "Email", "Group", "Role", "Created At"]
+PARTICIPANTS_HEADER = ["ID", "Full Name", "Email", "Group", "Registered At"]
+# Appended to every row of a delta (?since=) export
+DELTA_HEADER = ["Updated At", "Deleted"]
+
+
+def _iso(value) -> str:
+    return value.isoformat() if value is not None else ""
+
+
+class ExportService:
+    """Row generators for the CSV exports.
+
+    Rows are read with column-only selects in keyset batches, so neither
+    ORM objects nor a long-lived read cursor are held while a client
+    downloads; memory stays flat however large the table is.
+
+    With `since`, only rows changed at or after it are exported, followed
+    by a row for every deletion (ID, change time and Deleted=1).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def events(self, since: Optional[datetime] = None) -> Iterator[list]:
+        yield EVENTS_HEADER + DELTA_HEADER if since else EVENTS_HEADER
+        stmt = select(
+            Event.id, Event.title, Event.description, Event.date, Event.location,
+            Event.max_participants, Event.registration_count, Event.status, Event.created_at,
+            Event.updated_at
+        )
+        keys = (Event.id,)
+        if since:
+            # Page in updated_at order so the index serves filter and order
+            stmt = stmt.where(Event.updated_at >= since)
+            keys = (Event.updated_at, Event.id)
+        for batch in self._batches(stmt, *keys):
+            for e in batch:
+                row = [
+                    e.id, e.title, e.description or "", _iso(e.date), e.location,
+                    e.max_participants, e.registration_count, e.status, _iso(e.created_at)
+                ]
+                yield row + [_iso(e.updated_at), 0] if since else row
+        if since:
+            yield from self._deleted_rows(EVENT, since, len(EVENTS_HEADER))
+
+    def users(self, since: Optional[datetime] = None) -> Iterator[list]:
+        yield USERS_HEADER + DELTA_HEADER if since else USERS_HEADER
+        stmt = select(
+            User.id, User.full_name, User.email, User.group, User.role, User.created_at,
+            User.updated_at
+        )
+        keys = (User.id,)
+        if since:
+            stmt = stmt.where(User.updated_at >= since)
+            keys = (User.updated_at, User.id)
+        for batch in self._batches(stmt, *keys):
+            for u in batch:
+                row = [u.id, u.full_name, u.email, u.group or "", u.role.value, _iso(u.created_at)]
+                yield row + [_iso(u.updated_at), 0] if since else row
+        if since:
+            yield from self._deleted_rows(USER, since, len(USERS_HEADER))
+
+    def participants(self, event_id: int, since: Optional[datetime] = None) -> Iterator[list]:
+        stmt = select(
+            Registration.id, User.id.label("user_id"), User.full_name, User.email,
+            User.group, Registration.registered_at, Registration.updated_at
+        ).join(User, User.id == Registration.user_id).where(Registration.event_id == event_id)
+        keys = (Registration.id,)
+        if since:
+            stmt = stmt.where(Registration.updated_at >= since)
+            keys = (Registration.updated_at, Registration.id)
+        yield from self._participant_rows(
+            (r for batch in self._batches(stmt, *keys) for r in batch), since
+        )
+        if since:
+            # Participants are identified by user, so deletions report the user id
+            yield from self._deleted_rows(
+                REGISTRATION, since, len(PARTICIPANTS_HEADER), event_id=event_id, by_user=True
+            )
+
+    def participants_by_event(
+        self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+    ) -> Iterator[Tuple[Any, Iterator[list]]]:
+        """(event, participant rows) for every event dated in [date_from, date_to).
+
+        All participants come from one joined scan ordered by event, split
+        into per-event groups as it goes.
+        """
+        events_stmt = select(Event.id, Event.title, Event.date)
+        if date_from is not None:
+            events_stmt = events_stmt.where(Event.date >= date_from)
+        if date_to is not None:
+            events_stmt = events_stmt.where(Event.date < date_to)
+        events = self.db.execute(events_stmt.order_by(Event.id)).all()
+        if not events:
+            return
+
+        stmt = select(
+            Registration.event_id, Registration.id, User.id.label("user_id"), User.full_name,
+            User.email, User.group, Registration.registered_at
+        ).join(User, User.id == Registration.user_id).where(
+            Registration.event_id.in_(events_stmt.with_only_columns(Event.id).scalar_subquery())
+        )
+        rows = (r for batch in self._batches(stmt, Registration.event_id, Registration.id) for r in batch)
+        groups = groupby(rows, key=lambda r: r.event_id)
+        current = next(groups, None)
+        for event in events:
+            participants = iter(())
+            if current is not None and current[0] == event.id:
+                participants = current[1]
+            yield event, self._participant_rows(participants)
+            if current is not None and current[0] == event.id:
+                current = next(groups, None)
+
+    def _participant_rows(self, participants, since: Optional[datetime] = None) -> Iterator[list]:
+        yield PARTICIPANTS_HEADER + DELTA_HEADER if since else PARTICIPANTS_HEADER
+        for r in participants:
+            row = [r.user_id, r.full_name, r.email, r.group or "", _iso(r.registered_at)]
+            yield row + [_iso(r.updated_at), 0] if since else row
+
+    def _deleted_rows(self, entity: str, since: datetime, width: int,
+                      event_id: Optional[int] = None, by_user: bool = False) -> Iterator[list]:
+        stmt = ChangeService.deleted_since(entity, since, event_id)
+        for batch in self._batches(stmt, Tombstone.id):
+            for t in batch:
+                yield [t.user_id if by_user else t.entity_id] + [""] * (width - 1) + [_iso(t.deleted_at), 1]
+
+    def _batches(self, stmt, *keys) -> Iterator[List[Any]]:
+        """Run `stmt` in pages ordered by `keys`, which must all be selected"""
+        last = None
+        while True:
+            page = stmt
+            if last is not None:
+                if len(keys) == 1:
+                    page = stmt.where(keys[0] > last[0])
+                else:
+                    page = stmt.where(tuple_(*keys) > tuple_(*last))
+            rows = self.db.execute(page.order_by(*keys).limit(EXPORT_BATCH_SIZE)).all()
+            if rows:
+                yield rows
+            if len(rows) < EXPORT_BATCH_SIZE:
+                return
+            last = tuple(rows[-1]._mapping[key] for key in keys)
+
+
+def csv_chunks(rows: Iterable[list], rows_per_chunk: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode rows as UTF-8 CSV, one chunk per `rows_per_chunk` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ZipSink:
+    """Write-only file object whose contents are drained after every write"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_chunks(files: Iterable[Tuple[str, Iterable[bytes]]]) -> Iterator[bytes]:
+    """Stream a ZIP archive of (name, content chunks) pairs without seeking"""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in files:
+            with archive.open(name, mode="w", force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_participants_archive(
+    date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+) -> Iterator[bytes]:
+    """ZIP with one participants CSV per event, read on a dedicated session"""
+    db = SessionLocal()
+    try:
+        files = (
+            (f"event_{event.id}_participants.csv", csv_chunks(rows))
+            for event, rows in ExportService(db).participants_by_event(date_from, date_to)
+        )
+        yield from zip_chunks(files)
+    finally:
+        db.close()
+
+
+def stream_csv(export: Callable[..., Iterable[list]], *args, compress: bool = False) -> Iterator[bytes]:
+    """CSV bytes of `export(ExportService, *args)`, read on a dedicated session.
+
+    The request's session may be closed before streaming starts, so the
+    generator owns its own.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            yield from csv_chunks(export(ExportService(db), *args))
+        finally:
+            db.close()
+
+    return gzip_chunks(generate()) if compress else generate()
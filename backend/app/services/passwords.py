@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed: str) -> int:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), 0 if unknown"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool.
+
+    Hashing is CPU-bound for hundreds of milliseconds, so doing it in the
+    request threadpool starves every sync endpoint during sign-up storms.
+    Here it is awaited from async handlers and at most `max_queue` hashes
+    may be pending; beyond that requests are turned away with a 503.
+    A pool broken by a dead worker is replaced and the call retried once.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, rounds: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.restarts = 0
+        self._total_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(check_password, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def record_rehash(self) -> None:
+        with self._lock:
+            self.rehashed += 1
+
+    def start(self) -> None:
+        """Start the worker processes now rather than on the first sign-in"""
+        with self._lock:
+            executor = self._ensure_executor()
+        executor.submit(hash_rounds, "").result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "rounds": self.rounds,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "restarts": self.restarts,
+                "avg_ms": round(self._total_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            }
+
+    async def _run(self, fn, *args):
+        for _ in range(2):
+            executor = self._acquire()
+            started = time.monotonic()
+            try:
+                future: Future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._finished(started, ok=False)
+                self._discard(executor)
+                continue
+            except BaseException:
+                self._finished(started, ok=False)
+                raise
+            future.add_done_callback(
+                lambda f, started=started: self._finished(
+                    started, ok=not f.cancelled() and f.exception() is None
+                )
+            )
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise _unavailable("Password hashing is restarting, please retry")
+
+    def _acquire(self) -> ProcessPoolExecutor:
+        """Count a pending hash and return the executor to submit it to"""
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise _unavailable("Too many sign-ins in progress, please retry")
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            return self._ensure_executor()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool; the next call starts a fresh one"""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _finished(self, started: float, ok: bool) -> None:
+        """Release a pending slot; only successful hashes count towards avg_ms"""
+        with self._lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+                self._total_seconds += time.monotonic() - started
+            else:
+                self.failed += 1
+
+
+def _unavailable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": "1"}
+    )
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_QUEUE,
+    settings.BCRYPT_ROUNDS
+)
@@ -0,0 +1,392 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Optional: suggestions fall back to plain upcoming events
+    np = None
+    sparse = None
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.event import Event
+from app.models.registration import Registration
+from app.models.user import User
+from app.services.revision_service import RevisionService
+
+logger = logging.getLogger(__name__)
+
+# Weights of the score components, each scaled to [0, 1]
+CF_WEIGHT = 0.6
+GROUP_WEIGHT = 0.3
+POPULARITY_WEIGHT = 0.1
+# Recommendations kept per user; more than shown so some can be filtered out
+TOP_N = 20
+# Users scored per sparse matrix product during a rebuild
+USER_BATCH_SIZE = 1024
+
+
+class _Model:
+    """Matrices and precomputed lists from one rebuild"""
+
+    def __init__(self):
+        self.event_pos: Dict[int, int] = {}
+        self.max_event_id = 0
+        self.event_ids = None          # all event ids, by matrix column
+        self.titles: Dict[int, str] = {}
+        self.candidates = None         # column positions of open upcoming events
+        self.similarity = None         # events x candidates, cosine of co-registrations
+        self.group_scores: Dict[str, "np.ndarray"] = {}
+        self.popularity = None         # per candidate, scaled to [0, 1]
+        self.max_count = 0.0           # registrations of the most popular candidate
+        self.group_size: Dict[str, float] = {}
+        self.user_events: Dict[int, "np.ndarray"] = {}
+        self.user_group: Dict[int, Optional[str]] = {}
+        self.user_top: Dict[int, list] = {}
+        self.group_top: Dict[str, list] = {}
+        self.default_top: list = []
+
+
+class RecommendationEngine:
+    """Item-based collaborative filtering blended with group affinity.
+
+    A rebuild loads all registrations into a sparse user x event matrix R
+    and derives the event co-registration matrix R^T R, cosine-normalized.
+    A user's collaborative score for an open upcoming event is the mean
+    similarity to the events they joined. It is blended with the share
+    of their group (User.group) that joined the event and with overall
+    popularity. Top-N lists are precomputed per user, per group, and for
+    users with neither, so a request is a dictionary lookup.
+
+    Registrations made through this process re-score just that user
+    against the current similarity matrix. Events created after the
+    build (by any worker) are folded into the model as they appear:
+    they become candidates scored by group share and popularity, and
+    get co-registration similarity at the next full rebuild. That runs
+    in the background once the events revision has moved and
+    RECOMMENDATION_REFRESH_SECONDS have passed; after a failed rebuild
+    the next attempt waits RECOMMENDATION_RETRY_SECONDS.
+    """
+
+    def __init__(self):
+        self._model: Optional[_Model] = None
+        self._lock = threading.Lock()
+        # Held while new events are folded in or a rebuild runs
+        self._refresh_lock = threading.Lock()
+        self.revision: Optional[int] = None
+        self.built_at = 0.0
+        self.failed_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def rebuild(self, db: Session) -> None:
+        if not self.available:
+            return
+        started = time.monotonic()
+        revision = RevisionService(db).get_events_revision()
+        model = _build_model(db)
+        with self._lock:
+            self._model = model
+            self.revision = revision
+            self.built_at = time.monotonic()
+        logger.info(
+            f"Recommendations rebuilt: {len(model.event_pos)} events, "
+            f"{len(model.user_events)} active users in {time.monotonic() - started:.3f}s"
+        )
+
+    def refresh_if_stale(self, db: Session) -> None:
+        if not self.available or not self._refresh_lock.acquire(blocking=False):
+            return
+        rebuilding = False
+        try:
+            model = self._model
+            if model is not None and (db.query(func.max(Event.id)).scalar() or 0) > model.max_event_id:
+                self._add_new_events(db, model)
+            if self._rebuild_due(db):
+                # The background thread releases the refresh lock when done
+                threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+                rebuilding = True
+        finally:
+            if not rebuilding:
+                self._refresh_lock.release()
+
+    def _rebuild_due(self, db: Session) -> bool:
+        now = time.monotonic()
+        if now - self.built_at < settings.RECOMMENDATION_REFRESH_SECONDS:
+            return False
+        if now - self.failed_at < settings.RECOMMENDATION_RETRY_SECONDS:
+            return False
+        if RevisionService(db).get_events_revision() == self.revision:
+            self.built_at = now
+            return False
+        return True
+
+    def _rebuild_in_background(self) -> None:
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception:
+            self.failed_at = time.monotonic()
+            logger.exception("Recommendation rebuild failed")
+        finally:
+            db.close()
+            self._refresh_lock.release()
+
+    def _add_new_events(self, db: Session, model: _Model) -> None:
+        """Fold events created after the model was built into it"""
+        events = db.query(
+            Event.id, Event.title, Event.date, Event.registration_count, Event.max_participants
+        ).filter(Event.id > model.max_event_id).order_by(Event.id).all()
+        if not events:
+            return
+        regs = db.query(Registration.user_id, Registration.event_id).filter(
+            Registration.event_id > model.max_event_id,
+            Registration.event_id <= events[-1].id
+        ).all()
+        with self._lock:
+            _add_events(model, events, regs)
+        logger.info(f"Recommendations: added {len(events)} new events")
+
+    def record_registration(self, user_id: int, event_id: int, registered: bool) -> None:
+        """Re-score one user after they joined or left an event"""
+        model = self._model
+        if model is None or event_id not in model.event_pos:
+            return
+        with self._lock:
+            position = model.event_pos[event_id]
+            events = model.user_events.get(user_id, np.empty(0, dtype=np.int64))
+            if registered:
+                events = np.union1d(events, [position])
+            else:
+                events = events[events != position]
+            model.user_events[user_id] = events
+            if len(events):
+                cf = np.asarray(model.similarity[events].sum(axis=0)).ravel() / len(events)
+                model.user_top[user_id] = _top_items(
+                    model, cf[None, :], [model.user_group.get(user_id)], [events]
+                )[0]
+            else:
+                model.user_top.pop(user_id, None)
+
+    def recommend(self, user_id: int, group: Optional[str]) -> Optional[List[dict]]:
+        """Precomputed (event_id, score, reason) items, or None if no model is built"""
+        model = self._model
+        if model is None:
+            return None
+        return (
+            model.user_top.get(user_id)
+            or model.group_top.get(group)
+            or model.default_top
+        )
+
+
+def _build_model(db: Session) -> _Model:
+    model = _Model()
+    now = datetime.utcnow()
+
+    events = db.query(
+        Event.id, Event.title, Event.date, Event.registration_count, Event.max_participants
+    ).all()
+    model.event_ids = np.array([e.id for e in events], dtype=np.int64)
+    model.event_pos = {e.id: i for i, e in enumerate(events)}
+    model.max_event_id = max(model.event_pos, default=0)
+    model.titles = {e.id: e.title for e in events}
+    model.candidates = np.array(
+        [i for i, e in enumerate(events) if e.date > now and e.registration_count < e.max_participants],
+        dtype=np.int64
+    )
+
+    users = db.query(User.id, User.group).all()
+    user_pos = {u.id: i for i, u in enumerate(users)}
+    model.user_group = {u.id: u.group for u in users}
+
+    regs = db.query(Registration.user_id, Registration.event_id).all()
+    rows = np.fromiter((user_pos[r.user_id] for r in regs), dtype=np.int64, count=len(regs))
+    cols = np.fromiter((model.event_pos[r.event_id] for r in regs), dtype=np.int64, count=len(regs))
+    R = sparse.csr_matrix(
+        (np.ones(len(regs), dtype=np.float32), (rows, cols)),
+        shape=(len(users), len(events))
+    )
+
+    # Cosine similarity between events from co-registration counts
+    co = (R.T @ R).tocsr()
+    degree = co.diagonal()
+    inv_norm = np.divide(1.0, np.sqrt(degree), out=np.zeros_like(degree), where=degree > 0)
+    similarity = sparse.diags(inv_norm) @ co @ sparse.diags(inv_norm)
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    model.similarity = similarity.tocsc()[:, model.candidates].tocsr()
+
+    R_candidates = R.tocsc()[:, model.candidates].tocsr()
+    counts = np.asarray(R_candidates.sum(axis=0)).ravel()
+    model.max_count = float(counts.max()) if counts.size else 0.0
+    model.popularity = counts / model.max_count if model.max_count > 0 else np.zeros(len(model.candidates))
+
+    # Share of each group's members registered for each candidate
+    groups = sorted({u.group for u in users if u.group})
+    group_pos = {g: i for i, g in enumerate(groups)}
+    member_rows = [user_pos[u.id] for u in users if u.group]
+    M = sparse.csr_matrix(
+        (np.ones(len(member_rows), dtype=np.float32),
+         (member_rows, [group_pos[u.group] for u in users if u.group])),
+        shape=(len(users), len(groups))
+    )
+    group_size = np.asarray(M.sum(axis=0)).ravel()
+    group_counts = (M.T @ R_candidates).toarray()
+    for g, i in group_pos.items():
+        model.group_size[g] = float(group_size[i])
+        model.group_scores[g] = group_counts[i] / group_size[i]
+
+    # Users with registrations: batched sparse products R_batch @ S
+    active = np.flatnonzero(np.diff(R.indptr))
+    for start in range(0, len(active), USER_BATCH_SIZE):
+        batch = active[start:start + USER_BATCH_SIZE]
+        R_batch = R[batch]
+        cf = (R_batch @ model.similarity).toarray()
+        cf /= np.asarray(R_batch.sum(axis=1))
+        batch_users = [users[i].id for i in batch]
+        batch_events = [R_batch.indices[R_batch.indptr[k]:R_batch.indptr[k + 1]] for k in range(len(batch))]
+        tops = _top_items(model, cf, [model.user_group[u] for u in batch_users], batch_events)
+        for user_id, events_joined, top in zip(batch_users, batch_events, tops):
+            model.user_events[user_id] = np.sort(events_joined.astype(np.int64))
+            model.user_top[user_id] = top
+
+    # Users without registrations get their group's list, or the overall one
+    empty = np.empty(0, dtype=np.int64)
+    zeros = np.zeros((1, len(model.candidates)))
+    for g in groups:
+        model.group_top[g] = _top_items(model, zeros, [g], [empty])[0]
+    model.default_top = _top_items(model, zeros, [None], [empty])[0]
+    return model
+
+
+def _add_events(model: _Model, events, regs) -> None:
+    """Append events newer than the model and merge them into the top-N lists.
+
+    New events have no co-registration similarity until the next full
+    rebuild, so their score is group share and popularity alone, the
+    same for every member of a group. Each precomputed list only has to
+    be merged with its group's scored new events.
+    """
+    now = datetime.utcnow()
+    first = len(model.event_ids)
+    positions = {e.id: first + i for i, e in enumerate(events)}
+    model.event_ids = np.concatenate([model.event_ids, np.array([e.id for e in events], dtype=np.int64)])
+    model.event_pos.update(positions)
+    model.max_event_id = max(positions, default=model.max_event_id)
+    model.titles.update((e.id, e.title) for e in events)
+
+    new_candidates = [e for e in events if e.date > now and e.registration_count < e.max_participants]
+    new_cols = np.array([positions[e.id] for e in new_candidates], dtype=np.int64)
+    model.candidates = np.concatenate([model.candidates, new_cols])
+    similarity = sparse.vstack([
+        model.similarity, sparse.csr_matrix((len(events), model.similarity.shape[1]), dtype=np.float32)
+    ])
+    model.similarity = sparse.hstack([
+        similarity, sparse.csr_matrix((similarity.shape[0], len(new_cols)), dtype=np.float32)
+    ]).tocsr()
+
+    joined: Dict[int, set] = {}
+    members = {g: np.zeros(len(new_candidates)) for g in model.group_scores}
+    column = {e.id: i for i, e in enumerate(new_candidates)}
+    for user_id, event_id in regs:
+        joined.setdefault(user_id, set()).add(event_id)
+        position = positions[event_id]
+        model.user_events[user_id] = np.union1d(
+            model.user_events.get(user_id, np.empty(0, dtype=np.int64)), [position]
+        )
+        group = model.user_group.get(user_id)
+        if group in members and event_id in column:
+            members[group][column[event_id]] += 1
+
+    counts = np.array([e.registration_count for e in new_candidates], dtype=np.float64)
+    popularity = np.minimum(counts / max(model.max_count, 1.0), 1.0)
+    model.popularity = np.concatenate([model.popularity, popularity])
+    for g, shares in members.items():
+        shares /= model.group_size[g]
+        model.group_scores[g] = np.concatenate([model.group_scores[g], shares])
+    if not new_candidates:
+        return
+
+    def scored(group_name):
+        shares = members.get(group_name, np.zeros(len(new_candidates)))
+        return [
+            {
+                "event_id": e.id,
+                "score": round(float(GROUP_WEIGHT * share + POPULARITY_WEIGHT * pop), 4),
+                "reason": f"Popular in your group {group_name}" if share > 0 else "Popular upcoming event"
+            }
+            for e, share, pop in zip(new_candidates, shares, popularity)
+        ]
+
+    new_items = {g: scored(g) for g in members}
+    default_items = scored(None)
+    for g in model.group_top:
+        model.group_top[g] = _merge_items(model.group_top[g], new_items[g], set())
+    model.default_top = _merge_items(model.default_top, default_items, set())
+    for user_id, top in model.user_top.items():
+        items = new_items.get(model.user_group.get(user_id), default_items)
+        model.user_top[user_id] = _merge_items(top, items, joined.get(user_id, set()))
+
+
+def _merge_items(items: list, new_items: list, joined: set) -> list:
+    merged = items + [item for item in new_items if item["event_id"] not in joined]
+    merged.sort(key=lambda item: -item["score"])
+    return merged[:TOP_N]
+
+
+def _top_items(model: _Model, cf, groups: list, joined: list) -> List[list]:
+    """Blend score components and pick the TOP_N candidates for each row"""
+    if not len(model.candidates):
+        return [[] for _ in groups]
+    no_group = np.zeros(len(model.candidates))
+    group = np.vstack([model.group_scores.get(g, no_group) for g in groups])
+    scores = CF_WEIGHT * cf + GROUP_WEIGHT * group + POPULARITY_WEIGHT * model.popularity
+
+    candidate_col = {int(p): c for c, p in enumerate(model.candidates)}
+    results = []
+    for row, (group_name, events_joined) in enumerate(zip(groups, joined)):
+        row_scores = scores[row].copy()
+        for position in events_joined:
+            col = candidate_col.get(int(position))
+            if col is not None:
+                row_scores[col] = -np.inf
+        n = min(TOP_N, int(np.isfinite(row_scores).sum()))
+        if n == 0:
+            results.append([])
+            continue
+        best = np.argpartition(-row_scores, n - 1)[:n]
+        best = best[np.argsort(-row_scores[best])]
+        items = []
+        for col in best:
+            event_id = int(model.event_ids[model.candidates[col]])
+            items.append({
+                "event_id": event_id,
+                "score": round(float(row_scores[col]), 4),
+                "reason": _reason(model, cf[row, col], group[row, col], group_name, events_joined, col)
+            })
+        results.append(items)
+    return results
+
+
+def _reason(model: _Model, cf: float, group: float, group_name, events_joined, col) -> str:
+    if cf > 0 and CF_WEIGHT * cf >= GROUP_WEIGHT * group:
+        # The joined event most similar to this one explains the match
+        similar = model.similarity[events_joined, col].toarray().ravel()
+        source = int(model.event_ids[events_joined[int(similar.argmax())]])
+        return f"Students who joined \"{model.titles[source]}\" also joined this"
+    if group > 0:
+        return f"Popular in your group {group_name}"
+    return "Popular upcoming event"
+
+
+recommendation_engine = RecommendationEngine()
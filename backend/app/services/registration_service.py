@@ -2,11 +2,22 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.models.registration import Registration
 from app.models.event import Event, EventStatus
+from app.pagination import keyset_paginate
+from app.cache import invalidate_listings
+from app.services.autocomplete import autocomplete_index
+from app.services.recommendations import recommendation_engine
+from app.services.revision_service import RevisionService
+from app.services.rollup_service import RollupService
+from app.services.change_service import ChangeService, REGISTRATION
+from app.services.stats_service import invalidate_timeseries
 
 
 class RegistrationService:
     def __init__(self, db: Session):
         self.db = db
+        self.revisions = RevisionService(db)
+        self.rollups = RollupService(db)
+        self.changes = ChangeService(db)
 
     def register_for_event(self, user_id: int, event_id: int) -> Registration:
         # Check event exists
@@ -40,9 +51,34 @@ class RegistrationService:
                 detail="You are already registered"
             )
         
+        # Conditional increment so concurrent sign-ups cannot overfill the event
+        updated = self.db.query(Event).filter(
+            Event.id == event_id,
+            Event.registration_count < Event.max_participants
+        ).update(
+            {
+                Event.registration_count: Event.registration_count + 1,
+                Event.revision: Event.revision + 1
+            },
+            synchronize_session=False
+        )
+        if not updated:
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No available spots"
+            )
+        
         registration = Registration(user_id=user_id, event_id=event_id)
         self.db.add(registration)
+        self.db.flush()
+        self.rollups.registration_added(user_id, registration.registered_at)
+        self.revisions.bump()
         self.db.commit()
+        invalidate_listings(self.revisions.get_events_revision())
+        autocomplete_index.adjust_popularity(event_id, 1)
+        autocomplete_index.advance(self.db)
+        recommendation_engine.record_registration(user_id, event_id, registered=True)
         self.db.refresh(registration)
         return registration
 
@@ -58,8 +94,29 @@ class RegistrationService:
                 detail="Registration not found"
             )
         
+        registered_at = registration.registered_at
         self.db.delete(registration)
+        self.rollups.registration_removed(user_id, registered_at)
+        self.changes.record_deletion(
+            REGISTRATION, registration.id, event_id=event_id, user_id=user_id
+        )
+        self.db.query(Event).filter(
+            Event.id == event_id,
+            Event.registration_count > 0
+        ).update(
+            {
+                Event.registration_count: Event.registration_count - 1,
+                Event.revision: Event.revision + 1
+            },
+            synchronize_session=False
+        )
+        self.revisions.bump()
         self.db.commit()
+        invalidate_listings(self.revisions.get_events_revision())
+        invalidate_timeseries("registrations", at=registered_at)
+        autocomplete_index.adjust_popularity(event_id, -1)
+        autocomplete_index.advance(self.db)
+        recommendation_engine.record_registration(user_id, event_id, registered=False)
 
     def get_user_registrations(self, user_id: int):
         registrations = self.db.query(Registration).filter(
@@ -67,3 +124,13 @@ class RegistrationService:
         ).all()
         return registrations
 
+    def get_user_registrations_page(self, user_id: int, limit: int, cursor: str = None):
+        """Return a page of the user's registrations ordered by id and the next cursor"""
+        query = self.db.query(Registration).filter(Registration.user_id == user_id)
+        return keyset_paginate(query, [Registration.id], limit, cursor=cursor)
+
+    def count_user_registrations(self, user_id: int) -> int:
+        return self.db.query(Registration).filter(
+            Registration.user_id == user_id
+        ).count()
+
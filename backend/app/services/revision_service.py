@@ -0,0 +1,48 @@
+import hashlib
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.revision import Revision
+
+# Bumped by every write that can change an event listing: event create,
+# update and delete, and registration changes.
+EVENTS_REVISION = "events"
+
+
+class RevisionService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, name: str) -> int:
+        value = self.db.query(Revision.value).filter(Revision.name == name).scalar()
+        return value or 0
+
+    def get_events_revision(self) -> int:
+        return self.get(EVENTS_REVISION)
+
+    def ensure(self, name: str) -> None:
+        if self.db.query(Revision.name).filter(Revision.name == name).first() is None:
+            self.db.add(Revision(name=name, value=0))
+            self.db.commit()
+
+    def bump(self, name: str = EVENTS_REVISION) -> None:
+        """Increment a revision as part of the caller's transaction (no commit)"""
+        updated = self.db.query(Revision).filter(Revision.name == name).update(
+            {Revision.value: Revision.value + 1},
+            synchronize_session=False
+        )
+        if not updated:
+            self.db.add(Revision(name=name, value=1))
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the values a response depends on"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
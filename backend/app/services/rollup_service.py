@@ -0,0 +1,212 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.event import Event
+from app.models.registration import Registration
+from app.models.stat_counter import StatCounter
+from app.models.user import User, UserRole
+
+# Rollup scopes stored in `stat_counters`
+TOTALS = "totals"  # keys: users, students, admins, events, registrations
+DAILY_REGISTRATIONS = "daily_registrations"  # keys: YYYY-MM-DD
+DAILY_USERS = "daily_users"  # keys: YYYY-MM-DD
+GROUP_REGISTRATIONS = "group_registrations"  # keys: group name, "" for no group
+
+_ROLE_TOTALS = {UserRole.STUDENT: "students", UserRole.ADMIN: "admins"}
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+# registration_count is not exported, so bumping it must not mark the user
+# as changed for delta exports (it would otherwise trigger onupdate)
+_KEEP_UPDATED_AT = {User.updated_at: User.updated_at}
+
+
+def day_key(value: datetime | date) -> str:
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+class RollupService:
+    """Statistics rollups maintained incrementally by the write paths.
+
+    Every `*_added`/`*_removed` method only stages changes in the caller's
+    transaction; the caller commits together with the rows being counted.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Reads
+
+    def totals(self) -> Dict[str, int]:
+        return self.scope(TOTALS)
+
+    def scope(self, scope: str, since: Optional[str] = None) -> Dict[str, int]:
+        """All counters of a scope; for daily scopes optionally from `since` on"""
+        query = self.db.query(StatCounter.key, StatCounter.value).filter(StatCounter.scope == scope)
+        if since is not None:
+            query = query.filter(StatCounter.key >= since)
+        return dict(query.all())
+
+    def snapshot(self, daily_since: str) -> Dict[str, Dict[str, int]]:
+        """Totals, group counters and recent daily counters in one query"""
+        rows = self.db.query(StatCounter.scope, StatCounter.key, StatCounter.value).filter(
+            or_(
+                StatCounter.scope.in_([TOTALS, GROUP_REGISTRATIONS]),
+                (StatCounter.scope.in_([DAILY_REGISTRATIONS, DAILY_USERS]))
+                & (StatCounter.key >= daily_since)
+            )
+        ).all()
+        result = {TOTALS: {}, GROUP_REGISTRATIONS: {}, DAILY_REGISTRATIONS: {}, DAILY_USERS: {}}
+        for scope, key, value in rows:
+            result[scope][key] = value
+        return result
+
+    # Writes (no commit)
+
+    def add(self, scope: str, key: str, delta: int = 1) -> None:
+        if not delta:
+            return
+        insert = _UPSERTS[self.db.get_bind().dialect.name]
+        stmt = insert(StatCounter).values(scope=scope, key=key, value=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StatCounter.scope, StatCounter.key],
+            set_={"value": StatCounter.value + delta}
+        )
+        self.db.execute(stmt)
+
+    def registration_added(self, user_id: int, registered_at: datetime, delta: int = 1) -> None:
+        """Count (or with delta=-1 uncount) one registration"""
+        group = self.db.query(User.group).filter(User.id == user_id).scalar()
+        self.db.query(User).filter(User.id == user_id).update(
+            {User.registration_count: User.registration_count + delta, **_KEEP_UPDATED_AT},
+            synchronize_session=False
+        )
+        self.add(TOTALS, "registrations", delta)
+        self.add(DAILY_REGISTRATIONS, day_key(registered_at), delta)
+        self.add(GROUP_REGISTRATIONS, group or "", delta)
+
+    def registration_removed(self, user_id: int, registered_at: datetime) -> None:
+        self.registration_added(user_id, registered_at, delta=-1)
+
+    def user_added(self, user: User) -> None:
+        self.add(TOTALS, "users")
+        self.add(TOTALS, _ROLE_TOTALS[user.role])
+        self.add(DAILY_USERS, day_key(user.created_at or datetime.utcnow()))
+
+    def user_group_changed(self, user: User, old_group: Optional[str]) -> None:
+        """Move the user's registrations to the counter of their new group"""
+        if (old_group or "") == (user.group or ""):
+            return
+        self.add(GROUP_REGISTRATIONS, old_group or "", -user.registration_count)
+        self.add(GROUP_REGISTRATIONS, user.group or "", user.registration_count)
+
+    def event_added(self) -> None:
+        self.add(TOTALS, "events")
+
+    def event_removed(self, event_id: int) -> None:
+        """Uncount an event and all of its registrations before they are deleted"""
+        registrations = self.db.query(Registration).filter(Registration.event_id == event_id)
+        day = func.date(Registration.registered_at)
+        for key, count in registrations.with_entities(day, func.count()).group_by(day):
+            self.add(DAILY_REGISTRATIONS, str(key), -count)
+        group = func.coalesce(User.group, "")
+        for key, count in registrations.join(User).with_entities(group, func.count()).group_by(group):
+            self.add(GROUP_REGISTRATIONS, key, -count)
+        user_ids = [user_id for (user_id,) in registrations.with_entities(Registration.user_id)]
+        if user_ids:
+            self.db.query(User).filter(User.id.in_(user_ids)).update(
+                {User.registration_count: User.registration_count - 1, **_KEEP_UPDATED_AT},
+                synchronize_session=False
+            )
+        self.add(TOTALS, "registrations", -len(user_ids))
+        self.add(TOTALS, "events", -1)
+
+    # Maintenance
+
+    def ensure(self) -> bool:
+        """Backfill the rollups if they have never been built; returns True if it did"""
+        if self.db.query(StatCounter.key).filter(StatCounter.scope == TOTALS).first() is not None:
+            return False
+        self.rebuild(fix=True)
+        return True
+
+    def rebuild(self, fix: bool = False) -> List[dict]:
+        """Recompute every rollup from the live tables and compare.
+
+        Returns the mismatches; with `fix=True` the stored rollups are
+        replaced by the recomputed values.
+        """
+        actual = self._compute()
+        stored = {scope: self.scope(scope) for scope in actual}
+
+        mismatches = []
+        for scope, values in actual.items():
+            for key in sorted(set(values) | set(stored[scope])):
+                expected, current = values.get(key, 0), stored[scope].get(key, 0)
+                if expected != current:
+                    mismatches.append({"scope": scope, "key": key, "stored": current, "actual": expected})
+
+        per_user = self.db.query(
+            Registration.user_id, func.count(Registration.id).label("count")
+        ).group_by(Registration.user_id).subquery()
+        actual_count = func.coalesce(per_user.c.count, 0)
+        user_rows = self.db.query(User.id, User.registration_count, actual_count).outerjoin(
+            per_user, per_user.c.user_id == User.id
+        ).filter(User.registration_count != actual_count).all()
+        mismatches.extend(
+            {"scope": "user_registrations", "key": str(user_id), "stored": stored_count, "actual": count}
+            for user_id, stored_count, count in user_rows
+        )
+
+        if fix:
+            self.db.query(StatCounter).filter(
+                StatCounter.scope.in_(list(actual))
+            ).delete(synchronize_session=False)
+            self.db.add_all(
+                StatCounter(scope=scope, key=key, value=value)
+                for scope, values in actual.items()
+                for key, value in values.items()
+            )
+            for user_id, _, count in user_rows:
+                self.db.query(User).filter(User.id == user_id).update(
+                    {User.registration_count: count, **_KEEP_UPDATED_AT},
+                    synchronize_session=False
+                )
+            self.db.commit()
+        return mismatches
+
+    def _compute(self) -> Dict[str, Dict[str, int]]:
+        roles = dict(self.db.query(User.role, func.count(User.id)).group_by(User.role).all())
+        totals = {
+            "users": sum(roles.values()),
+            "students": roles.get(UserRole.STUDENT, 0),
+            "admins": roles.get(UserRole.ADMIN, 0),
+            "events": self.db.query(func.count(Event.id)).scalar(),
+            "registrations": self.db.query(func.count(Registration.id)).scalar(),
+        }
+
+        registration_day = func.date(Registration.registered_at)
+        user_day = func.date(User.created_at)
+        group = func.coalesce(User.group, "")
+        return {
+            TOTALS: totals,
+            DAILY_REGISTRATIONS: {
+                str(key): count for key, count in self.db.query(
+                    registration_day, func.count(Registration.id)
+                ).group_by(registration_day)
+            },
+            DAILY_USERS: {
+                str(key): count for key, count in self.db.query(
+                    user_day, func.count(User.id)
+                ).group_by(user_day)
+            },
+            GROUP_REGISTRATIONS: dict(
+                self.db.query(group, func.count(Registration.id)).join(
+                    Registration, Registration.user_id == User.id
+                ).group_by(group).all()
+            ),
+        }
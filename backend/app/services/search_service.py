@@ -0,0 +1,407 @@
+import html
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import Float, Integer, String, case, cast, func, literal, or_, select, text, union_all
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, defer
+
+from app.models.event import Event
+from app.models.event_trigram import EventTrigram
+from app.services.text_normalize import normalize_text, trigrams, similarity
+from app.pagination import keyset_paginate, encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "events_fts"
+
+# External-content FTS5 table over events(title, description). The
+# triggers keep it in step with every insert, delete and text update, so
+# services do not have to touch it.
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='events', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# Title matches weigh more than description matches in bm25()
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Fuzzy matches below this trigram similarity are dropped
+FUZZY_THRESHOLD = 0.3
+# Upper bound on events pulled from the trigram index per fuzzy query
+FUZZY_CANDIDATES = 200
+# Event fields indexed for fuzzy search
+TRIGRAM_FIELDS = ("title", "location")
+
+# Highlight boundaries emitted by FTS5; control characters that do not
+# occur in event text, so the text can be escaped before they become <mark>
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+# Histograms available through ?facets=
+FACETS = ("location", "week", "status", "spots")
+
+_fts_enabled: Optional[bool] = None
+
+
+def match_expression(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    tokens = re.findall(r"\w+", q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def highlight_html(value: Optional[str]) -> Optional[str]:
+    """Escape FTS5 highlight output and turn its markers into <mark> tags"""
+    if value is None:
+        return None
+    return html.escape(value).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        # Fuzzy rankings by query and filters; one service serves one request
+        self._fuzzy_ranked = {}
+
+    @property
+    def fts_enabled(self) -> bool:
+        global _fts_enabled
+        if _fts_enabled is None:
+            bind = self.db.get_bind()
+            _fts_enabled = bind.dialect.name == "sqlite" and self.db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                {"name": FTS_TABLE}
+            ).first() is not None
+        return _fts_enabled
+
+    def ensure_index(self) -> bool:
+        """Create the FTS table and triggers if missing.
+
+        Returns True when the table was just created and still has to be
+        filled with `rebuild_index()`.
+        """
+        global _fts_enabled
+        if self.db.get_bind().dialect.name != "sqlite":
+            _fts_enabled = False
+            return False
+        exists = self.db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+        try:
+            for ddl in FTS_DDL:
+                self.db.execute(text(ddl))
+            self.db.commit()
+        except OperationalError as e:
+            # SQLite built without FTS5; search falls back to LIKE
+            self.db.rollback()
+            logger.warning(f"Full-text search disabled: {e}")
+            _fts_enabled = False
+            return False
+        _fts_enabled = True
+        return not exists
+
+    def rebuild_index(self) -> int:
+        """Re-read every event into the FTS index; returns the event count"""
+        self.db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        self.db.commit()
+        return self.db.query(Event).count()
+
+    def search_events(
+        self,
+        q: str,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        has_spots: Optional[bool] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_description: bool = True
+    ):
+        """Return one page of (event, score, title_highlight, snippet) tuples and the next cursor.
+
+        Uses the FTS index when available, best match first (bm25 score,
+        lower is better), and falls back to a LIKE scan ordered by date
+        otherwise. Pages are keyset-paginated on the sort order.
+        Highlights are HTML: the event text is escaped and only the
+        matched terms are wrapped in <mark>.
+        """
+        match = match_expression(q) if self.fts_enabled else None
+        if match:
+            fts = text(
+                f"SELECT rowid AS event_id,"
+                f" bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score,"
+                f" highlight({FTS_TABLE}, 0, :mark_start, :mark_end) AS title_highlight,"
+                f" snippet({FTS_TABLE}, 1, :mark_start, :mark_end, '…', 16) AS snippet"
+                f" FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+            ).bindparams(match=match, mark_start=MARK_START, mark_end=MARK_END).columns(
+                event_id=Integer, score=Float, title_highlight=String, snippet=String
+            ).subquery("fts")
+            query = self.db.query(
+                Event, fts.c.score, fts.c.title_highlight, fts.c.snippet
+            ).join(fts, fts.c.event_id == Event.id)
+        else:
+            query = self.db.query(Event).filter(
+                or_(
+                    Event.title.ilike(f"%{q}%"),
+                    Event.description.ilike(f"%{q}%")
+                )
+            )
+
+        query = self._apply_filters(query, location, date_from, date_to, has_spots)
+        if not include_description:
+            query = query.options(defer(Event.description))
+
+        if match:
+            rows, next_cursor = keyset_paginate(
+                query, [fts.c.score, Event.id], limit, cursor=cursor,
+                key=lambda row: [row.score, row.Event.id]
+            )
+            return [
+                (e, score, highlight_html(title_highlight), highlight_html(snippet))
+                for e, score, title_highlight, snippet in rows
+            ], next_cursor
+        events, next_cursor = keyset_paginate(query, [Event.date, Event.id], limit, cursor=cursor)
+        return [(e, None, None, None) for e in events], next_cursor
+
+    def count_matches(
+        self,
+        q: str,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        has_spots: Optional[bool] = None,
+        fuzzy: bool = False
+    ) -> int:
+        """Number of events matching the search on all pages"""
+        if fuzzy:
+            return len(self._rank_fuzzy(q, location, date_from, date_to, has_spots, False))
+        query = self.db.query(func.count(Event.id)).filter(self._text_condition(q))
+        return self._apply_filters(query, location, date_from, date_to, has_spots).scalar()
+
+    def facet_counts(
+        self,
+        q: str,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        has_spots: Optional[bool] = None,
+        facets: Sequence[str] = FACETS,
+        fuzzy: bool = False
+    ) -> Dict[str, Dict[str, int]]:
+        """Count matching events per facet value for the same filters as search.
+
+        Every facet is a GROUP BY over one CTE of the matches, combined
+        with UNION ALL so all histograms come back in a single query.
+        Weeks are keyed by their Monday (YYYY-MM-DD); spots by
+        "with_spots" / "without_spots".
+        """
+        result = {facet: {} for facet in facets}
+        if not facets:
+            return result
+
+        if fuzzy:
+            # Fuzzy matches are scored in Python and already bounded
+            rows = self._rank_fuzzy(q, location, date_from, date_to, has_spots, False)
+            for event, _score in rows:
+                values = {
+                    "location": event.location,
+                    "week": (event.date - timedelta(days=event.date.weekday())).date().isoformat(),
+                    "status": event.status.value,
+                    "spots": "with_spots" if event.has_spots else "without_spots",
+                }
+                for facet in facets:
+                    counts = result[facet]
+                    counts[values[facet]] = counts.get(values[facet], 0) + 1
+            return result
+
+        query = self.db.query(
+            Event.location.label("location"),
+            self._week_start(Event.date).label("week"),
+            Event.status.label("status"),
+            case((Event.has_spots, "with_spots"), else_="without_spots").label("spots")
+        ).filter(self._text_condition(q))
+        matched = self._apply_filters(query, location, date_from, date_to, has_spots).cte("matched")
+
+        histograms = union_all(*[
+            select(
+                literal(facet).label("facet"),
+                cast(matched.c[facet], String).label("value"),
+                func.count().label("count")
+            ).group_by(matched.c[facet])
+            for facet in facets
+        ])
+        for facet, value, count in self.db.execute(histograms):
+            result[facet][value] = count
+        return result
+
+    def _text_condition(self, q: str):
+        """WHERE clause matching `q` against title and description"""
+        match = match_expression(q) if self.fts_enabled else None
+        if match:
+            return Event.id.in_(
+                text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(match=match)
+            )
+        return or_(
+            Event.title.ilike(f"%{q}%"),
+            Event.description.ilike(f"%{q}%")
+        )
+
+    def _week_start(self, column):
+        """SQL expression for the Monday of the column's week as YYYY-MM-DD"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            return func.date(column, "weekday 0", "-6 days")
+        return func.to_char(func.date_trunc("week", column), "YYYY-MM-DD")
+
+    def fuzzy_search_events(
+        self,
+        q: str,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        has_spots: Optional[bool] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_description: bool = True
+    ):
+        """Return one page of (event, similarity) pairs for typo-tolerant matches and the next cursor.
+
+        Candidates come from the trigram index (an indexed IN lookup), so
+        only events sharing enough trigrams with the query and passing the
+        filters are read, and never more than FUZZY_CANDIDATES of them.
+        The ranking is computed once per service; later pages, the count
+        and the facets of the same search reuse it.
+        """
+        results = self._rank_fuzzy(q, location, date_from, date_to, has_spots, include_description)
+
+        # The ranked list is bounded, so the cursor is simply a position in it
+        start = decode_cursor(cursor, [int])[0] if cursor else 0
+        end = start + limit
+        next_cursor = encode_cursor([end]) if end < len(results) else None
+        return results[start:end], next_cursor
+
+    def _rank_fuzzy(self, q, location, date_from, date_to, has_spots, include_description):
+        """All fuzzy matches as (event, similarity), best first"""
+        key = (q, location, date_from, date_to, has_spots)
+        cached = self._fuzzy_ranked.get(key)
+        if cached is not None and (cached[1] or not include_description):
+            return cached[0]
+
+        query_trigrams = trigrams(normalize_text(q))
+        if not query_trigrams:
+            return []
+
+        # Similarity >= threshold needs at least threshold * |query| shared trigrams
+        min_shared = max(1, math.ceil(FUZZY_THRESHOLD * len(query_trigrams)))
+        shared = func.count(func.distinct(EventTrigram.trigram))
+        candidates = self.db.query(
+            EventTrigram.event_id, shared.label("shared")
+        ).join(Event, Event.id == EventTrigram.event_id).filter(
+            EventTrigram.trigram.in_(query_trigrams)
+        )
+        # Filter before the cut, or filtered matches could rank past it
+        candidates = self._apply_filters(candidates, location, date_from, date_to, has_spots)
+        candidates = candidates.group_by(EventTrigram.event_id).having(
+            shared >= min_shared
+        ).order_by(shared.desc()).limit(FUZZY_CANDIDATES).subquery()
+
+        query = self.db.query(Event).join(candidates, candidates.c.event_id == Event.id)
+        if not include_description:
+            query = query.options(defer(Event.description))
+
+        results = []
+        for event in query.all():
+            score = max(
+                _field_similarity(query_trigrams, getattr(event, field))
+                for field in TRIGRAM_FIELDS
+            )
+            if score >= FUZZY_THRESHOLD:
+                results.append((event, score))
+        results.sort(key=lambda r: (-r[1], r[0].date, r[0].id))
+        self._fuzzy_ranked[key] = (results, include_description)
+        return results
+
+    def index_event(self, event: Event) -> None:
+        """Replace the event's trigram rows; part of the caller's transaction"""
+        self.remove_event(event.id)
+        self.db.add_all(_trigram_rows(event.id, event.title, event.location))
+
+    def remove_event(self, event_id: int) -> None:
+        self.db.query(EventTrigram).filter(
+            EventTrigram.event_id == event_id
+        ).delete(synchronize_session=False)
+
+    def rebuild_trigrams(self) -> int:
+        """Recompute the trigram index for all events; returns the event count"""
+        self.db.query(EventTrigram).delete(synchronize_session=False)
+        count = 0
+        for event_id, title, location in self.db.query(
+            Event.id, Event.title, Event.location
+        ).yield_per(500):
+            self.db.bulk_save_objects(_trigram_rows(event_id, title, location))
+            count += 1
+        self.db.commit()
+        return count
+
+    def ensure_trigrams(self) -> bool:
+        """Build the trigram index if it is empty but events exist"""
+        if self.db.query(EventTrigram.event_id).first() is not None:
+            return False
+        if self.db.query(Event.id).first() is None:
+            return False
+        self.rebuild_trigrams()
+        return True
+
+    @staticmethod
+    def _apply_filters(query, location, date_from, date_to, has_spots):
+        if location:
+            query = query.filter(Event.location.ilike(f"%{location}%"))
+        if date_from:
+            query = query.filter(Event.date >= date_from)
+        if date_to:
+            query = query.filter(Event.date <= date_to)
+        if has_spots:
+            query = query.filter(Event.has_spots)
+        return query
+
+
+def _trigram_rows(event_id: int, title: str, location: str):
+    rows = []
+    for field, value in zip(TRIGRAM_FIELDS, (title, location)):
+        rows.extend(
+            EventTrigram(trigram=t, event_id=event_id, field=field)
+            for t in trigrams(normalize_text(value))
+        )
+    return rows
+
+
+def _field_similarity(query_trigrams, value: str) -> float:
+    """Best of whole-field and per-word similarity, so one matching word in a long title counts"""
+    normalized = normalize_text(value)
+    best = similarity(query_trigrams, trigrams(normalized))
+    for word in normalized.split():
+        best = max(best, similarity(query_trigrams, trigrams(word)))
+    return best
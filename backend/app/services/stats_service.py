@@ -0,0 +1,374 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # Optional: gaps are filled in pure Python
+    np = None
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.cache import CachedResult, stats_cache, timeseries_cache
+from app.database import SessionLocal
+from app.models.event import Event
+from app.models.registration import Registration
+from app.models.user import User, UserRole
+from app.services.rollup_service import (
+    RollupService, TOTALS, DAILY_USERS, DAILY_REGISTRATIONS, GROUP_REGISTRATIONS, day_key
+)
+
+# metric name -> timestamp column that is bucketed
+TIMESERIES_METRICS = {
+    "registrations": Registration.registered_at,
+    "users": User.created_at,
+    "events": Event.created_at,
+}
+GRANULARITIES = ("hour", "day", "week", "month")
+MAX_BUCKETS = 10000
+
+_NUMPY_UNITS = {"hour": "h", "day": "D", "week": "W", "month": "M"}
+
+
+class StatsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def timeseries(self, metric: str, start: datetime, end: datetime, granularity: str) -> List[dict]:
+        """Zero-filled counts per bucket for [start, end).
+
+        Buckets that have already closed are cached per (metric, range,
+        granularity); only the still-open bucket is queried on every call.
+        """
+        start = floor_bucket(start, granularity)
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be after start"
+            )
+        if _estimate_buckets(start, end, granularity) > MAX_BUCKETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Range too large for {granularity} buckets (max {MAX_BUCKETS})"
+            )
+
+        open_from = floor_bucket(datetime.utcnow(), granularity)
+        closed_end = min(end, open_from)
+
+        buckets: List[dict] = []
+        if closed_end > start:
+            key = ("timeseries", metric, granularity, start, closed_end)
+            closed = timeseries_cache.get(key)
+            if closed is None:
+                closed = self._bucket_counts(metric, start, closed_end, granularity)
+                timeseries_cache.set(key, closed)
+            buckets.extend(closed)
+        if end > open_from:
+            buckets.extend(self._bucket_counts(metric, max(start, open_from), end, granularity))
+        return buckets
+
+    def dashboard(self) -> dict:
+        """Admin dashboard: totals and daily counts from the rollups, three queries"""
+        now = datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - timedelta(days=6)
+        window_start = now - timedelta(days=7)
+
+        rollups = RollupService(self.db).snapshot(daily_since=day_key(first_day))
+        totals = rollups[TOTALS]
+        per_day = rollups[DAILY_REGISTRATIONS]
+
+        # Upcoming/finished change with time, so count them on the date index.
+        # last_7_days is a rolling 7x24h window: the daily counters cover
+        # first_day..now, the partial day before it is counted here.
+        upcoming_events, window_edge = self.db.query(
+            select(func.count(Event.id)).where(Event.date > now).scalar_subquery(),
+            select(func.count(Registration.id)).where(
+                Registration.registered_at >= window_start,
+                Registration.registered_at < first_day
+            ).scalar_subquery()
+        ).one()
+
+        # Most popular events (top 5), from the maintained counter
+        popular_events = self.db.query(
+            Event.id, Event.title, Event.registration_count
+        ).order_by(Event.registration_count.desc(), Event.id).limit(5).all()
+
+        # Registrations per day (last 7 days), newest first, zero-filled
+        daily_registrations = []
+        for i in range(7):
+            key = day_key(today - timedelta(days=i))
+            daily_registrations.append({"date": key, "count": per_day.get(key, 0)})
+
+        total_events = totals.get("events", 0)
+        return {
+            "users": {
+                "total": totals.get("users", 0),
+                "students": totals.get("students", 0),
+                "admins": totals.get("admins", 0)
+            },
+            "events": {
+                "total": total_events,
+                "upcoming": upcoming_events,
+                "finished": total_events - upcoming_events
+            },
+            "registrations": {
+                "total": totals.get("registrations", 0),
+                "last_7_days": sum(per_day.values()) + window_edge,
+                "daily": daily_registrations
+            },
+            "popular_events": [
+                {"id": e.id, "title": e.title, "registrations": e.registration_count}
+                for e in popular_events
+            ]
+        }
+
+    def report(self) -> dict:
+        """System report for the last 30 days, from the rollups"""
+        now = datetime.utcnow()
+        month_ago = now - timedelta(days=30)
+
+        rollups = RollupService(self.db).snapshot(daily_since=day_key(month_ago))
+        totals = rollups[TOTALS]
+
+        # User stats
+        total_users = totals.get("users", 0)
+        new_users_month = sum(rollups[DAILY_USERS].values())
+
+        # Event stats
+        total_events = totals.get("events", 0)
+        upcoming_events = self.db.query(func.count(Event.id)).filter(Event.date > now).scalar()
+
+        # Registration stats
+        total_registrations = totals.get("registrations", 0)
+        registrations_month = sum(rollups[DAILY_REGISTRATIONS].values())
+
+        # Average registrations per event
+        if total_events > 0:
+            avg_registrations = total_registrations / total_events
+        else:
+            avg_registrations = 0
+
+        # Most active group ("" collects users without a group)
+        group_stats = max(
+            ((group, count) for group, count in rollups[GROUP_REGISTRATIONS].items() if group and count > 0),
+            key=lambda item: item[1],
+            default=None
+        )
+
+        return {
+            "report_date": now.isoformat(),
+            "period": "Last 30 days",
+            "users": {
+                "total": total_users,
+                "new_this_month": new_users_month,
+                "growth_rate": round(new_users_month / max(total_users - new_users_month, 1) * 100, 1)
+            },
+            "events": {
+                "total": total_events,
+                "upcoming": upcoming_events,
+                "average_registrations": round(avg_registrations, 1)
+            },
+            "registrations": {
+                "total": total_registrations,
+                "this_month": registrations_month
+            },
+            "insights": {
+                "most_active_group": group_stats[0] if group_stats else None,
+                "most_active_group_registrations": group_stats[1] if group_stats else 0
+            }
+        }
+
+    def event_stats(self, event_ids: Iterable[int]) -> Dict[int, dict]:
+        """Per-event statistics for many events in three queries.
+
+        Events that do not exist are missing from the result.
+        """
+        event_ids = list(dict.fromkeys(event_ids))
+        if not event_ids:
+            return {}
+        events = self.db.query(
+            Event.id, Event.title, Event.max_participants, Event.registration_count
+        ).filter(Event.id.in_(event_ids)).all()
+        stats = {
+            e.id: {
+                "event_id": e.id,
+                "title": e.title,
+                "total_registrations": e.registration_count,
+                "capacity": e.max_participants,
+                "fill_rate": round(e.registration_count / e.max_participants * 100, 1),
+                "group_distribution": {},
+                "registration_timeline": {}
+            }
+            for e in events
+        }
+        if not stats:
+            return stats
+        
+        group = func.coalesce(User.group, "No Group")
+        groups = self.db.query(
+            Registration.event_id, group, func.count(Registration.id)
+        ).join(User, User.id == Registration.user_id).filter(
+            Registration.event_id.in_(list(stats))
+        ).group_by(Registration.event_id, group)
+        for event_id, name, count in groups:
+            stats[event_id]["group_distribution"][name] = count
+        
+        day = func.date(Registration.registered_at)
+        timeline = self.db.query(
+            Registration.event_id, day, func.count(Registration.id)
+        ).filter(
+            Registration.event_id.in_(list(stats))
+        ).group_by(Registration.event_id, day).order_by(Registration.event_id, day)
+        for event_id, date, count in timeline:
+            stats[event_id]["registration_timeline"][str(date)] = count
+        return stats
+
+    def leaderboard(self, skip: int = 0, limit: int = 10, group: Optional[str] = None):
+        """A page of the student leaderboard and the number of ranked students"""
+        query = self._ranked_students(group)
+        total = query.with_entities(func.count(User.id)).scalar()
+        rows = query.with_entities(
+            User.id, User.full_name, User.group, User.registration_count
+        ).order_by(User.registration_count.desc(), User.id).offset(skip).limit(limit).all()
+        return rows, total
+
+    def leaderboard_rank(self, user: User, group: Optional[str] = None) -> Optional[int]:
+        """1-based position of `user` on the leaderboard, or None if unranked"""
+        if user.role != UserRole.STUDENT or user.registration_count <= 0:
+            return None
+        if group is not None and user.group != group:
+            return None
+        ahead = self._ranked_students(group).filter(
+            or_(
+                User.registration_count > user.registration_count,
+                and_(User.registration_count == user.registration_count, User.id < user.id)
+            )
+        ).with_entities(func.count(User.id)).scalar()
+        return ahead + 1
+
+    def _ranked_students(self, group: Optional[str]):
+        query = self.db.query(User).filter(
+            User.role == UserRole.STUDENT,
+            User.registration_count > 0
+        )
+        if group is not None:
+            query = query.filter(User.group == group)
+        return query
+
+    def _bucket_counts(self, metric: str, start: datetime, end: datetime, granularity: str) -> List[dict]:
+        """One GROUP BY over [start, end), gaps filled with zeros"""
+        column = TIMESERIES_METRICS[metric]
+        bucket = self._bucket_expression(column, granularity)
+        rows = self.db.query(bucket, func.count()).filter(
+            column >= start, column < end
+        ).group_by(bucket).all()
+        observed = {_parse_bucket(value): count for value, count in rows if value is not None}
+        return fill_gaps(observed, start, end, granularity)
+
+    def _bucket_expression(self, column, granularity: str):
+        if self.db.get_bind().dialect.name == "sqlite":
+            if granularity == "hour":
+                return func.strftime("%Y-%m-%d %H:00:00", column)
+            if granularity == "day":
+                return func.date(column)
+            if granularity == "week":
+                return func.date(column, "weekday 0", "-6 days")
+            return func.strftime("%Y-%m-01", column)
+        return func.date_trunc(granularity, column)
+
+
+def cached_stats(key, compute: Callable[["StatsService"], Any]) -> CachedResult:
+    """Serve `compute(service)` from the shared stats cache.
+
+    The computation gets its own session because a stale entry is
+    refreshed in the background, after the request has finished.
+    """
+    def run():
+        db = SessionLocal()
+        try:
+            return compute(StatsService(db))
+        finally:
+            db.close()
+
+    return stats_cache.get_or_compute(key, run)
+
+
+def floor_bucket(value: datetime, granularity: str) -> datetime:
+    """Start of the bucket containing `value` (weeks start on Monday)"""
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def fill_gaps(observed: Dict[datetime, int], start: datetime, end: datetime, granularity: str) -> List[dict]:
+    """Every bucket start in [start, end) with its count, zero where nothing was observed"""
+    if np is not None:
+        last = floor_bucket(end - timedelta(microseconds=1), granularity)
+        if granularity == "week":
+            # numpy weeks are anchored on a Thursday, so step by seven days
+            unit, step = "D", 7
+        else:
+            unit, step = _NUMPY_UNITS[granularity], 1
+        starts = np.arange(
+            np.datetime64(start, unit), np.datetime64(last, unit) + step, step
+        ).astype("datetime64[s]")
+        counts = np.zeros(len(starts), dtype=np.int64)
+        if observed and len(starts):
+            keys = np.array(list(observed), dtype="datetime64[s]")
+            values = np.fromiter(observed.values(), dtype=np.int64, count=len(observed))
+            positions = np.minimum(np.searchsorted(starts, keys), len(starts) - 1)
+            hit = starts[positions] == keys
+            counts[positions[hit]] = values[hit]
+        return [
+            {"start": s.item().isoformat(), "count": int(c)}
+            for s, c in zip(starts, counts)
+        ]
+
+    buckets = []
+    current = start
+    while current < end:
+        buckets.append({"start": current.isoformat(), "count": observed.get(current, 0)})
+        current = _next_bucket(current, granularity)
+    return buckets
+
+
+def invalidate_timeseries(metric: Optional[str] = None, at: Optional[datetime] = None) -> None:
+    """Drop cached closed buckets that a deletion may have changed.
+
+    With `at`, only ranges containing that timestamp are dropped.
+    """
+    def affected(key):
+        _, key_metric, _granularity, start, end = key
+        if metric is not None and key_metric != metric:
+            return False
+        return at is None or start <= at < end
+
+    timeseries_cache.invalidate("timeseries", where=affected)
+
+
+def _next_bucket(value: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return value + timedelta(hours=1)
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(days=7)
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _estimate_buckets(start: datetime, end: datetime, granularity: str) -> float:
+    seconds = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": 28 * 86400}[granularity]
+    return (end - start).total_seconds() / seconds
+
+
+def _parse_bucket(value) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
@@ -0,0 +1,45 @@
+import re
+import unicodedata
+from typing import Set
+
+# Kazakh and Russian Cyrillic to Latin, close to what students type when
+# transliterating by hand
+_CYRILLIC_TO_LATIN = {
+    "а": "a", "ә": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d",
+    "е": "e", "ё": "e", "ж": "zh", "з": "z", "и": "i", "й": "i", "к": "k",
+    "қ": "k", "л": "l", "м": "m", "н": "n", "ң": "n", "о": "o", "ө": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ұ": "u", "ү": "u",
+    "ф": "f", "х": "h", "һ": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh",
+    "ъ": "", "ы": "y", "і": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+_TRANSLITERATION = str.maketrans(_CYRILLIC_TO_LATIN)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(value: str) -> str:
+    """Case-fold, transliterate Cyrillic to Latin and strip diacritics.
+
+    "Шахмат Турнирі" and "shahmat turniri" both become "shahmat turniri".
+    """
+    if not value:
+        return ""
+    value = value.casefold().translate(_TRANSLITERATION)
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", value).strip()
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Trigrams of every word, padded like PostgreSQL's pg_trgm"""
+    result = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
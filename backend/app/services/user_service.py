@@ -2,12 +2,15 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserUpdate
-from app.services.auth import get_password_hash, verify_password
+from app.services.auth import get_password_hash, invalidate_principal
+from app.pagination import keyset_paginate
+from app.services.rollup_service import RollupService
 
 
 class UserService:
     def __init__(self, db: Session):
         self.db = db
+        self.rollups = RollupService(db)
 
     def get_by_email(self, email: str) -> User | None:
         return self.db.query(User).filter(User.email == email).first()
@@ -15,7 +18,9 @@ class UserService:
     def get_by_id(self, user_id: int) -> User | None:
         return self.db.query(User).filter(User.id == user_id).first()
 
-    def create_user(self, user_data: UserCreate, role: UserRole = UserRole.STUDENT) -> User:
+    def create_user(self, user_data: UserCreate, role: UserRole = UserRole.STUDENT,
+                    hashed_password: str | None = None) -> User:
+        """Create a user; pass `hashed_password` when it was hashed off-thread"""
         if self.get_by_email(user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,35 +29,52 @@ class UserService:
         
         user = User(
             email=user_data.email,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=hashed_password or get_password_hash(user_data.password),
             full_name=user_data.full_name,
             group=user_data.group,
             role=role
         )
         self.db.add(user)
+        self.db.flush()
+        self.rollups.user_added(user)
         self.db.commit()
         self.db.refresh(user)
         return user
 
-    def authenticate(self, email: str, password: str) -> User | None:
-        user = self.get_by_email(email)
-        if not user or not verify_password(password, user.hashed_password):
-            return None
-        return user
+    def set_password_hash(self, user: User, hashed_password: str) -> None:
+        # The hash is not exported, so a rehash at login must not mark the
+        # user as changed for delta exports (onupdate would bump updated_at)
+        self.db.query(User).filter(User.id == user.id).update(
+            {User.hashed_password: hashed_password, User.updated_at: User.updated_at},
+            synchronize_session=False
+        )
+        self.db.commit()
+        self.db.refresh(user)
 
     def update_user(self, user_id: int, user_data: UserUpdate) -> User:
         user = self.get_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
+        old_group = user.group
         update_data = user_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(user, field, value)
         
+        self.rollups.user_group_changed(user, old_group)
         self.db.commit()
+        invalidate_principal(user.id)
         self.db.refresh(user)
         return user
 
-    def get_all_users(self, skip: int = 0, limit: int = 100):
-        return self.db.query(User).offset(skip).limit(limit).all()
+    def get_all_users(self, skip: int = 0, limit: int = 100, cursor: str | None = None):
+        """Return a page of users ordered by id and the cursor of the next page"""
+        return keyset_paginate(
+            self.db.query(User), [User.id], limit,
+            cursor=cursor,
+            offset=0 if cursor else skip
+        )
+
+    def count_users(self) -> int:
+        return self.db.query(User).count()
 
@@ -0,0 +1,128 @@
+"""Latency of concurrent requests while the user lookup in auth is slow.
+
+Every SELECT on `users` is delayed (simulating a locked SQLite file) and
+a batch of authenticated requests is fired together with cheap
+unauthenticated /health probes. With a blocking auth dependency the
+probes queue behind the lookups on the event loop; with the threadpool
+dependency they stay fast.
+
+Requests are capped at the connection pool size: past it, waiting
+checkouts starve the requests holding connections of the loop (blocking)
+or of worker threads, and everything stalls until the pool timeout.
+
+Usage (from backend/):
+    python benchmarks/auth_latency.py [--requests 12] [--delay-ms 50] [--mode both]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Annotated, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_dir = tempfile.mkdtemp(prefix="auth-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+import httpx  # noqa: E402
+from fastapi import Depends, Header  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database import engine, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.auth import get_current_user  # noqa: E402
+
+
+async def blocking_get_current_user(
+    authorization: Annotated[Optional[str], Header(convert_underscores=False)] = None,
+    db: Session = Depends(get_db)
+):
+    """The previous behaviour: an async dependency doing the sync lookup on the loop"""
+    return get_current_user(authorization, db)
+
+
+def slow_user_lookups(delay: float) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def delay_users(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            time.sleep(delay)
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def timed(client: httpx.AsyncClient, url: str, headers=None) -> float:
+    start = time.perf_counter()
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(mode: str, requests: int, token: str) -> dict:
+    if mode == "blocking":
+        app.dependency_overrides[get_current_user] = blocking_get_current_user
+    else:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[timed(client, "/api/users/me", headers) for _ in range(requests)],
+            *[timed(client, "/health") for _ in range(requests)]
+        )
+        wall = (time.perf_counter() - started) * 1000
+    authed, probes = results[:requests], results[requests:]
+    return {
+        "mode": mode,
+        "wall_ms": wall,
+        "authed_p50": statistics.median(authed),
+        "authed_p95": percentile(authed, 0.95),
+        "health_p50": statistics.median(probes),
+        "health_p95": percentile(probes, 0.95),
+    }
+
+
+async def main_async(args) -> None:
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/auth/register", json={
+                "email": "bench@example.com",
+                "password": "bench-password",
+                "full_name": "Bench User",
+                "group": "1F1"
+            })
+            response.raise_for_status()
+            token = response.json()["access_token"]
+
+        slow_user_lookups(args.delay_ms / 1000)
+        modes = ["blocking", "threadpool"] if args.mode == "both" else [args.mode]
+        pool_limit = engine.pool.size() + engine.pool._max_overflow
+        if args.requests > pool_limit:
+            sys.exit(f"--requests must be at most {pool_limit} (connection pool size)")
+        print(f"{args.requests} authenticated requests + {args.requests} /health probes, "
+              f"users lookup delayed {args.delay_ms} ms")
+        print(f"{'mode':<11} {'wall':>9} {'auth p50':>9} {'auth p95':>9} {'health p50':>11} {'health p95':>11}")
+        for mode in modes:
+            r = await run(mode, args.requests, token)
+            print(f"{r['mode']:<11} {r['wall_ms']:>7.0f}ms {r['authed_p50']:>7.0f}ms {r['authed_p95']:>7.0f}ms "
+                  f"{r['health_p50']:>9.0f}ms {r['health_p95']:>9.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--delay-ms", type=float, default=50.0)
+    parser.add_argument("--mode", choices=["blocking", "threadpool", "both"], default="both")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from app.services.stats_service import StatsService
+
+
+def _auth(response) -> dict:
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _populate(client) -> None:
+    admin = _auth(client.post("/api/auth/admin/register", json={
+        "email": "admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    }))
+    students = [
+        _auth(client.post("/api/auth/register", json={
+            "email": f"s{i}@test.kz", "password": "pw", "full_name": f"Student {i}", "group": f"1F{i % 2}"
+        }))
+        for i in range(4)
+    ]
+    now = datetime.utcnow()
+    for i in range(8):
+        response = client.post("/api/events/", headers=admin, json={
+            "title": f"Event {i}",
+            "description": "",
+            "date": (now + timedelta(days=i - 3)).isoformat(),
+            "location": "Hall",
+            "max_participants": 10
+        })
+        assert response.status_code == 201, response.text
+        if i >= 4:
+            for headers in students[:i - 3]:
+                assert client.post(f"/api/registrations/{response.json()['id']}", headers=headers).status_code == 201
+
+
+def test_dashboard_query_count_is_constant(client, db, count_queries):
+    with count_queries() as empty:
+        stats = StatsService(db).dashboard()
+    assert stats["users"]["total"] == 0
+
+    _populate(client)
+    db.expire_all()
+    with count_queries() as populated:
+        stats = StatsService(db).dashboard()
+    assert stats["users"]["total"] == 5
+    assert stats["events"]["total"] == 8
+    assert stats["registrations"]["total"] == 10
+    assert stats["popular_events"][0]["registrations"] == 4
+
+    assert empty.count == populated.count
+    assert populated.count <= 3
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.models.export_job import ExportJob, ExportJobStatus, ExportKind
+from app.services import export_jobs
+from app.services.export_jobs import ExportJobService, ExportWorker
+from app.services.stats_service import StatsService
+
+
+def _job(job_id: str, status: ExportJobStatus, heartbeat_age: float = None) -> ExportJob:
+    heartbeat_at = None
+    if heartbeat_age is not None:
+        heartbeat_at = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    return ExportJob(
+        id=job_id, kind=ExportKind.EVENTS, status=status, filename="events.csv",
+        created_by=1, worker="other-host:1:abcd", heartbeat_at=heartbeat_at
+    )
+
+
+def test_fail_interrupted_spares_jobs_with_a_live_worker(client, db):
+    timeout = settings.EXPORT_JOB_HEARTBEAT_TIMEOUT
+    db.add_all([
+        _job("live-running", ExportJobStatus.RUNNING, heartbeat_age=1),
+        _job("live-queued", ExportJobStatus.QUEUED, heartbeat_age=1),
+        _job("stale-running", ExportJobStatus.RUNNING, heartbeat_age=timeout + 60),
+        _job("no-heartbeat", ExportJobStatus.QUEUED),
+    ])
+    db.commit()
+
+    assert ExportJobService(db).fail_interrupted() == 2
+    db.expire_all()
+    statuses = dict(db.query(ExportJob.id, ExportJob.status).filter(ExportJob.id.in_([
+        "live-running", "live-queued", "stale-running", "no-heartbeat"
+    ])).all())
+    assert statuses == {
+        "live-running": ExportJobStatus.RUNNING,
+        "live-queued": ExportJobStatus.QUEUED,
+        "stale-running": ExportJobStatus.FAILED,
+        "no-heartbeat": ExportJobStatus.FAILED,
+    }
+
+
+def _admin(client, email: str) -> dict:
+    response = client.post("/api/auth/admin/register", json={
+        "email": email, "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    })
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_slow_report_keeps_its_heartbeat_and_is_private(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_JOB_HEARTBEAT_TIMEOUT", 0.6)
+    monkeypatch.setattr(export_jobs, "export_worker", ExportWorker(1))
+
+    def slow_report(self):
+        time.sleep(1.5)
+        return {"ok": True}
+
+    monkeypatch.setattr(StatsService, "report", slow_report)
+    owner = _admin(client, "export-owner@test.kz")
+    other = _admin(client, "export-other@test.kz")
+    response = client.post("/api/export/jobs", headers=owner, json={"kind": "report"})
+    assert response.status_code == 202, response.text
+    job_id = response.json()["id"]
+
+    # Longer than the timeout, while the report is still being computed
+    time.sleep(1.0)
+    assert ExportJobService(db).fail_interrupted() == 0
+
+    for _ in range(50):
+        job = client.get(f"/api/export/jobs/{job_id}", headers=owner).json()
+        if job["status"] != "running":
+            break
+        time.sleep(0.1)
+    assert job["status"] == "done"
+    assert client.get(f"/api/export/jobs/{job_id}", headers=other).status_code == 404
+    assert client.get(f"/api/export/jobs/{job_id}/download", headers=other).status_code == 404
+    assert client.get(f"/api/export/jobs/{job_id}/download", headers=owner).json() == {"ok": True}
+    export_jobs.export_worker.shutdown()
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from app.services.search_service import SearchService
+
+
+def test_fuzzy_search_ranks_once_for_page_count_and_facets(client, db, count_queries):
+    response = client.post("/api/auth/admin/register", json={
+        "email": "fuzzy-admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    })
+    assert response.status_code == 201, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for i, title in enumerate(["Volleyball cup", "Voleyball training", "Basketball"]):
+        response = client.post("/api/events/", headers=headers, json={
+            "title": title,
+            "description": "",
+            "date": (datetime.utcnow() + timedelta(days=i + 1)).isoformat(),
+            "location": "Gym",
+            "max_participants": 10
+        })
+        assert response.status_code == 201, response.text
+
+    service = SearchService(db)
+    filters = ("voleyball", None, None, None, None)
+    with count_queries() as queries:
+        rows, _ = service.fuzzy_search_events(*filters, limit=1)
+        count = service.count_matches(*filters, fuzzy=True)
+        facets = service.facet_counts(*filters, facets=["location"], fuzzy=True)
+    assert rows[0][0].title == "Voleyball training"
+    assert count == 2
+    assert facets == {"location": {"Gym": 2}}
+    assert queries.count == 1
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app.cache import listing_cache
+
+
+def test_writes_drop_listings_of_older_revisions(client):
+    response = client.post("/api/auth/admin/register", json={
+        "email": "cache-admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    })
+    assert response.status_code == 201, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def create_event(title: str) -> None:
+        response = client.post("/api/events/", headers=headers, json={
+            "title": title,
+            "description": "",
+            "date": (datetime.utcnow() + timedelta(days=2)).isoformat(),
+            "location": "Hall",
+            "max_participants": 10
+        })
+        assert response.status_code == 201, response.text
+
+    create_event("Cache first")
+    assert client.get("/api/events/", headers=headers).status_code == 200
+    assert client.get("/api/search/events", headers=headers, params={"q": "cache"}).status_code == 200
+    cached = [key for key in listing_cache._data if key[0] in ("events", "search")]
+    assert cached
+
+    invalidations = listing_cache.stats()["invalidations"]
+    create_event("Cache second")
+    assert not any(key in listing_cache._data for key in cached)
+    assert listing_cache.stats()["invalidations"] >= invalidations + len(cached)
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.models.user import User
+from app.services.passwords import PasswordHasher, hash_rounds, password_hasher
+
+
+def test_rehash_at_login_keeps_updated_at(client, db, monkeypatch):
+    credentials = {"email": "rehash@test.kz", "password": "pw"}
+    response = client.post("/api/auth/register", json={**credentials, "full_name": "Rehash", "group": "1F1"})
+    assert response.status_code == 201, response.text
+    user = db.query(User).filter(User.email == credentials["email"]).one()
+    updated_at, old_hash = user.updated_at, user.hashed_password
+
+    monkeypatch.setattr(password_hasher, "rounds", hash_rounds(old_hash) + 1)
+    assert client.post("/api/auth/login", json=credentials).status_code == 200
+
+    db.expire_all()
+    user = db.query(User).filter(User.email == credentials["email"]).one()
+    assert hash_rounds(user.hashed_password) == hash_rounds(old_hash) + 1
+    assert user.updated_at == updated_at
+
+
+def test_failed_hashes_are_not_counted_as_completed():
+    hasher = PasswordHasher(max_workers=1, max_queue=4, rounds=4)
+    try:
+        assert asyncio.run(hasher.verify("pw", asyncio.run(hasher.hash("pw"))))
+        with pytest.raises(ValueError):
+            asyncio.run(hasher.verify("pw", "not a bcrypt hash"))
+        stats = hasher.stats()
+        assert (stats["completed"], stats["failed"], stats["pending"]) == (2, 1, 0)
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from app.models.user import User
+from app.services import recommendations
+from app.services.recommendations import RecommendationEngine
+
+
+def _auth(response) -> dict:
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _create_event(client, headers, title: str) -> int:
+    response = client.post("/api/events/", headers=headers, json={
+        "title": title,
+        "description": "",
+        "date": (datetime.utcnow() + timedelta(days=5)).isoformat(),
+        "location": "Hall",
+        "max_participants": 10
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _wait_for_rebuild(engine: RecommendationEngine) -> None:
+    assert engine._refresh_lock.acquire(timeout=10)
+    engine._refresh_lock.release()
+
+
+def test_new_events_are_folded_in_and_failed_rebuilds_back_off(client, db, monkeypatch):
+    admin = _auth(client.post("/api/auth/admin/register", json={
+        "email": "rec-admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    }))
+    students = [
+        _auth(client.post("/api/auth/register", json={
+            "email": f"rec{i}@test.kz", "password": "pw", "full_name": f"Student {i}", "group": "REC1"
+        }))
+        for i in range(2)
+    ]
+    first = _create_event(client, admin, "Robotics")
+    assert client.post(f"/api/registrations/{first}", headers=students[0]).status_code == 201
+    engine = RecommendationEngine()
+    engine.rebuild(db)
+
+    builds = []
+
+    def failing_build(db):
+        builds.append(1)
+        raise RuntimeError("rebuild failed")
+
+    monkeypatch.setattr(recommendations, "_build_model", failing_build)
+    second = _create_event(client, admin, "Drones")
+    assert client.post(f"/api/registrations/{second}", headers=students[1]).status_code == 201
+
+    # The new event joins the model without a full rebuild
+    engine.refresh_if_stale(db)
+    student = db.query(User).filter(User.email == "rec0@test.kz").one()
+    items = engine.recommend(student.id, student.group)
+    assert items[0]["event_id"] == second
+    assert items[0]["reason"] == "Popular in your group REC1"
+    assert builds == []
+    engine.record_registration(student.id, second, registered=True)
+    assert second not in [item["event_id"] for item in engine.recommend(student.id, student.group)]
+
+    # A failed rebuild is not retried on every request
+    engine.built_at = 0.0
+    engine.refresh_if_stale(db)
+    _wait_for_rebuild(engine)
+    engine.refresh_if_stale(db)
+    _wait_for_rebuild(engine)
+    assert builds == [1]
+    assert engine.failed_at > 0
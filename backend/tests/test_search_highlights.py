@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+
+def test_highlights_escape_event_text(client):
+    response = client.post("/api/auth/admin/register", json={
+        "email": "search-admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    })
+    assert response.status_code == 201, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.post("/api/events/", headers=headers, json={
+        "title": "<script>alert(1)</script> Chess & Go",
+        "description": "Bring a <b>board</b> to the chess evening",
+        "date": (datetime.utcnow() + timedelta(days=3)).isoformat(),
+        "location": "Hall",
+        "max_participants": 10
+    })
+    assert response.status_code == 201, response.text
+
+    response = client.get("/api/search/events", headers=headers, params={"q": "chess"})
+    assert response.status_code == 200, response.text
+    highlights = response.json()["events"][0]["highlights"]
+    assert highlights["title"] == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>Chess</mark> &amp; Go"
+    assert highlights["description"] == "Bring a &lt;b&gt;board&lt;/b&gt; to the <mark>chess</mark> evening"
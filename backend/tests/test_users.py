@@ -0,0 +1,9 @@
+def test_users_limit_above_the_cap_is_clamped(client):
+    response = client.post("/api/auth/admin/register", json={
+        "email": "users-admin@test.kz", "password": "pw", "full_name": "Admin", "secret_key": "111111"
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.get("/api/users/", headers=headers, params={"limit": 5000})
+    assert response.status_code == 200, response.text
+    ids = [u["id"] for u in response.json()]
+    assert ids == sorted(ids)